@@ -0,0 +1,451 @@
+"""
+Agent context assembly as a pipeline of async stages.
+
+Each context mode is a set of independent stages (stats, project list,
+retrieval, summaries) that run concurrently, each under its own timeout.
+Filters extracted from the question are pushed into every stage's SQL.
+A stage that is slow or fails falls back to its recent last good result,
+or is left out when it is optional - either way the prompt says so - so the
+critical path is the slowest stage rather than the sum of all of them.
+When a required stage fails without a fallback, the other stages are
+cancelled. Formatting runs in a worker thread, off the event loop.
+"""
+import asyncio
+import re
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Any
+
+from pydantic_ai.messages import ModelMessage, ModelRequest, SystemPromptPart
+
+from aldi_hoc_companion.agent.filters import asset_where, describe, facets_where, parse_description, project_where
+from aldi_hoc_companion.core.config import ContextMode, get_settings
+from aldi_hoc_companion.core.logging import get_logger
+from aldi_hoc_companion.db import Database
+from aldi_hoc_companion.models.agent_models import QuestionFilters
+
+# Section headers of the formatted contexts, and the line naming the applied filters
+CONTEXT_HEADERS = ("=== DATABASE CONTENT ===", "=== DATABASE SUMMARY ===", "=== PROJECT SUMMARIES ===")
+FILTERS_LABEL = "FILTERED to rows matching the question: "
+_FILTERS_LINE_RE = re.compile(rf"^{re.escape(FILTERS_LABEL)}(.*)$", re.MULTILINE)
+
+# Stats only add a headline number - never wait long for them
+STATS_STAGE_TIMEOUT_SECONDS = 2.0
+
+# Last good results kept for degraded stages: few (a full-mode asset list is
+# the whole catalogue) and recent (older data is worse than a failed request)
+LAST_GOOD_MAX_ENTRIES = 8
+LAST_GOOD_MAX_AGE_SECONDS = 600.0
+
+
+class _LastGood:
+    """Bounded LRU of the last successful result per stage key, with a max age."""
+
+    def __init__(self, max_entries: int, max_age_seconds: float):
+        self._max_entries = max_entries
+        self._max_age_seconds = max_age_seconds
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: str) -> tuple[Any, float] | None:
+        """(result, age in seconds), or None when missing or too old."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        age = time.monotonic() - entry[0]
+        if age > self._max_age_seconds:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1], age
+
+    def put(self, key: str, result: Any) -> None:
+        self._entries[key] = (time.monotonic(), result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self._max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+_last_good = _LastGood(LAST_GOOD_MAX_ENTRIES, LAST_GOOD_MAX_AGE_SECONDS)
+
+# assets.cluster_id only exists once asset_clusters.sql is applied; re-checked after this long
+CLUSTER_KEY_TTL_SECONDS = 300.0
+_cluster_keys: dict[tuple, tuple[float, str]] = {}  # (host, db, schema) -> (checked at, GROUP BY key)
+
+
+@dataclass(frozen=True)
+class Stage:
+    name: str
+    fetch: Callable[[Database, QuestionFilters], Awaitable[Any]]
+    timeout: float
+    optional: bool = False  # optional stages are skipped instead of failing the request
+
+
+# -----------------------
+# Stage fetchers
+# -----------------------
+async def _fetch_stats(db: Database, filters: QuestionFilters) -> dict[str, Any]:
+    # Catalogue-wide totals, unfiltered, so the model knows the size of what it does not see
+    rows = await db.execute("""
+        SELECT
+            (SELECT COUNT(*) FROM projects) as total_projects,
+            (SELECT COUNT(*) FROM assets) as total_assets
+    """)
+    return rows[0]
+
+
+async def _fetch_projects(db: Database, filters: QuestionFilters) -> list[dict[str, Any]]:
+    where, params = project_where(filters)
+    return await db.execute(
+        f"SELECT project_id, project_name, year FROM projects p WHERE {where} ORDER BY year DESC",
+        tuple(params),
+    )
+
+
+async def cluster_key(db: Database) -> str:
+    """
+    GROUP BY key that collapses near-duplicate assets (see db/dedup.py).
+    Until asset_clusters.sql is applied every asset is its own group. The
+    column check is cached per database for CLUSTER_KEY_TTL_SECONDS.
+    """
+    settings = get_settings()
+    database = (settings.db_host, settings.db_name, settings.db_schema)
+    cached = _cluster_keys.get(database)
+    if cached is not None and time.monotonic() - cached[0] < CLUSTER_KEY_TTL_SECONDS:
+        return cached[1]
+    key = "COALESCE(a.cluster_id, a.id)" if await db.has_column("assets", "cluster_id") else "a.id"
+    _cluster_keys[database] = (time.monotonic(), key)
+    return key
+
+
+# Quoted slogans/headlines: "...", “...”, „...“, «...»
+_QUOTED_RE = re.compile(r'"([^"]+)"|“([^”]+)”|„([^“”]+)[“”]|«\s*([^»]+?)\s*»')
+_WORD_RE = re.compile(r"\w+")
+# Differing words shown per variant when it has no distinct quoted text
+MAX_VARIANT_TOKENS = 8
+
+
+def _quoted(text: str) -> list[str]:
+    return [next(group for group in match.groups() if group) for match in _QUOTED_RE.finditer(text)]
+
+
+def variant_differences(contents: list[str | None]) -> list[str]:
+    """
+    What sets each variant apart from the first (the one shown): its quoted
+    text that the first lacks, otherwise its first few words the first lacks.
+    """
+    first = contents[0] or ""
+    first_quotes = set(_quoted(first))
+    first_words = {word.lower() for word in _WORD_RE.findall(first)}
+    differences: list[str] = []
+    for content in contents[1:]:
+        quotes = [quote for quote in _quoted(content or "") if quote not in first_quotes]
+        if quotes:
+            difference = " / ".join(f'"{quote}"' for quote in quotes)
+        else:
+            words = [word for word in _WORD_RE.findall(content or "") if word.lower() not in first_words]
+            difference = " ".join(words[:MAX_VARIANT_TOKENS])
+        if difference and difference not in differences:
+            differences.append(difference)
+    return differences
+
+
+def variants_note(
+    variant_count: int, languages: str | None, versions: str | None, contents: list[str | None] | None = None
+) -> str:
+    """
+    E.g. ' (2 variants: Dutch, French; other variants: "Joyeux Noel")' for a
+    collapsed cluster whose contents are given in id order, "" for a single asset.
+    """
+    if variant_count <= 1:
+        return ""
+    note = f"{variant_count} variants: {languages or 'unknown language'}"
+    if versions:
+        note += f"; versions {versions}"
+    differences = variant_differences(contents) if contents else []
+    if differences:
+        note += "; other variants: " + " | ".join(differences)
+    return f" ({note})"
+
+
+def _format_asset_lines(rows: list[tuple]) -> list[str]:
+    return [
+        f"[{asset_kind}] {project_name}: {contents[0]}{variants_note(variant_count, languages, versions, contents)}\n"
+        for asset_kind, project_name, contents, variant_count, languages, versions in rows
+    ]
+
+
+async def _fetch_asset_lines(db: Database, filters: QuestionFilters) -> list[str]:
+    project_clause, project_params = project_where(filters)
+    asset_clause, asset_params = asset_where(filters)
+    # One line per near-duplicate cluster (see db/dedup.py): the lowest-id asset
+    # stands for its version/language variants, which add only the text that differs.
+    # Unclustered assets are their own cluster.
+    # Stream batch by batch and format each batch in a thread - only the formatted lines are kept
+    group_key = await cluster_key(db)
+    lines: list[str] = []
+    async for batch in db.execute_stream(f"""
+        SELECT (array_agg(a.asset_kind ORDER BY a.id))[1] AS asset_kind,
+               p.project_name,
+               array_agg(a.asset_content ORDER BY a.id) AS contents,
+               COUNT(*) AS variant_count,
+               string_agg(DISTINCT a.language, ', ') AS languages,
+               string_agg(DISTINCT a.version, ', ') AS versions
+        FROM assets a
+        JOIN projects p ON a.project_id = p.id
+        WHERE {project_clause} AND {asset_clause}
+        GROUP BY p.id, p.year, p.project_name, {group_key}
+        ORDER BY p.year DESC, p.project_name, MIN(a.id)
+    """, (*project_params, *asset_params)):
+        lines.extend(await asyncio.to_thread(_format_asset_lines, batch.rows))
+    return lines
+
+
+# Summary mode reads only the rollups. With filters, every count comes from
+# rollup_project_facets, which has all the filterable dimensions.
+async def _fetch_rollup_years(db: Database, filters: QuestionFilters) -> list[dict[str, Any]]:
+    if not filters:
+        return await db.execute("SELECT year, project_count, asset_count FROM rollup_year ORDER BY year DESC")
+    where, params = facets_where(filters)
+    return await db.execute(f"""
+        SELECT r.year, COUNT(DISTINCT r.project_id) AS project_count, SUM(r.asset_count) AS asset_count
+        FROM rollup_project_facets r
+        WHERE {where}
+        GROUP BY r.year
+        ORDER BY r.year DESC
+    """, tuple(params))
+
+
+async def _fetch_rollup_kind_language(db: Database, filters: QuestionFilters) -> list[dict[str, Any]]:
+    if not filters:
+        return await db.execute(
+            "SELECT asset_kind, language, asset_count FROM rollup_kind_language ORDER BY asset_kind, language"
+        )
+    where, params = facets_where(filters)
+    return await db.execute(f"""
+        SELECT r.asset_kind, r.language, SUM(r.asset_count) AS asset_count
+        FROM rollup_project_facets r
+        WHERE {where}
+        GROUP BY r.asset_kind, r.language
+        ORDER BY r.asset_kind, r.language
+    """, tuple(params))
+
+
+_PROJECT_KEYWORDS_JOIN = """
+        LEFT JOIN (
+            SELECT project_id, string_agg(keyword, ', ' ORDER BY rank) AS keywords
+            FROM rollup_project_keywords
+            GROUP BY project_id
+        ) k ON k.project_id = r.id
+"""
+
+
+async def _fetch_rollup_projects(db: Database, filters: QuestionFilters) -> list[dict[str, Any]]:
+    if not filters:
+        return await db.execute(f"""
+            SELECT r.project_name, r.year, r.asset_count, r.briefing_count, r.execution_count, k.keywords
+            FROM rollup_project r
+            {_PROJECT_KEYWORDS_JOIN}
+            ORDER BY r.year DESC, r.project_name
+        """)
+    where, params = facets_where(filters, alias="f")
+    year_where, year_params = facets_where(QuestionFilters(years=filters.years), alias="r")
+    # With asset constraints only projects that have matching assets are listed
+    match = "c.project_id IS NOT NULL" if filters.has_asset_filters else "TRUE"
+    return await db.execute(f"""
+        SELECT r.project_name, r.year,
+               COALESCE(c.asset_count, 0) AS asset_count,
+               COALESCE(c.briefing_count, 0) AS briefing_count,
+               COALESCE(c.execution_count, 0) AS execution_count,
+               k.keywords
+        FROM rollup_project r
+        LEFT JOIN (
+            SELECT f.project_id,
+                   SUM(f.asset_count) AS asset_count,
+                   SUM(f.asset_count) FILTER (WHERE f.campaign_context = 'briefing') AS briefing_count,
+                   SUM(f.asset_count) FILTER (WHERE f.campaign_context = 'execution') AS execution_count
+            FROM rollup_project_facets f
+            WHERE {where}
+            GROUP BY f.project_id
+        ) c ON c.project_id = r.id
+        {_PROJECT_KEYWORDS_JOIN}
+        WHERE {year_where} AND {match}
+        ORDER BY r.year DESC, r.project_name
+    """, (*params, *year_params))
+
+
+async def _fetch_project_summaries(db: Database, filters: QuestionFilters) -> list[dict[str, Any]]:
+    where, params = project_where(filters)
+    return await db.execute(f"""
+        SELECT p.id, p.project_name, p.year, s.summary
+        FROM projects p
+        LEFT JOIN project_summaries s ON s.project_id = p.id
+        WHERE {where}
+        ORDER BY p.year DESC, p.project_name
+    """, tuple(params))
+
+
+# -----------------------
+# Formatters (run in a worker thread)
+# -----------------------
+def _filters_line(filters: QuestionFilters, scope: str) -> str:
+    """The applied filters, and what they do and don't apply to in this mode."""
+    return f"\n{FILTERS_LABEL}{describe(filters)}\n({scope})\n" if filters else ""
+
+
+def _degraded_line(degraded: dict[str, str]) -> str:
+    """Tell the model which sections are stale or missing, e.g. "projects: result from 42s ago"."""
+    if not degraded:
+        return ""
+    return "\nINCOMPLETE DATA (live query failed) - " + "; ".join(f"{k}: {v}" for k, v in degraded.items()) + "\n"
+
+
+def _format_full(data: dict[str, Any]) -> str:
+    """ALL database content (matching the question's filters)."""
+    filters = data["filters"]
+    content = [
+        f"\n\n{CONTEXT_HEADERS[0]}\n",
+        _filters_line(filters, "projects and assets are filtered; STATS cover the whole catalogue"),
+        _degraded_line(data["degraded"]),
+    ]
+    if data["stats"]:
+        label = "STATS (whole catalogue)" if filters else "STATS"
+        content.append(f"\n{label}: {data['stats']['total_projects']} projects, {data['stats']['total_assets']} assets\n")
+
+    content.append(f"\n--- PROJECTS ({len(data['projects'])}) ---\n")
+    for p in data["projects"]:
+        content.append(f"- {p['project_name']} ({p['year']})\n")
+
+    content.append(f"\n--- ALL ASSETS ({len(data['assets'])}) ---\n")
+    content.extend(data["assets"])
+
+    return "".join(content)
+
+
+def _format_summary(data: dict[str, Any]) -> str:
+    """Compact context built only from the rollup views (one line per project)."""
+    lines = [
+        f"\n\n{CONTEXT_HEADERS[1]}",
+        _filters_line(data["filters"], "all counts are filtered; keywords cover all assets of a project"),
+        _degraded_line(data["degraded"]),
+    ]
+    if data["years"]:
+        total_projects = sum(y["project_count"] for y in data["years"])
+        total_assets = sum(y["asset_count"] for y in data["years"])
+        lines.append(f"\nSTATS: {total_projects} projects, {total_assets} assets")
+
+        lines.append("\n--- BY YEAR ---")
+        for y in data["years"]:
+            lines.append(f"- {y['year']}: {y['project_count']} projects, {y['asset_count']} assets")
+
+    if data["kind_language"]:
+        lines.append("\n--- ASSET KIND x LANGUAGE ---")
+        for k in data["kind_language"]:
+            lines.append(f"- {k['asset_kind']} / {k['language']}: {k['asset_count']}")
+
+    lines.append(f"\n--- PROJECTS ({len(data['projects'])}) ---")
+    for p in data["projects"]:
+        line = (
+            f"- {p['project_name']} ({p['year']}): {p['asset_count']} assets "
+            f"(briefing {p['briefing_count']}, execution {p['execution_count']})"
+        )
+        if p["keywords"]:
+            line += f" | keywords: {p['keywords']}"
+        lines.append(line)
+
+    return "\n".join(lines) + "\n"
+
+
+def _format_hierarchical(data: dict[str, Any]) -> str:
+    """First level of the hierarchical context: one summary paragraph per project."""
+    lines = [
+        f"\n\n{CONTEXT_HEADERS[2]}",
+        _filters_line(data["filters"], "only matching projects are listed; each summary covers the whole project"),
+        _degraded_line(data["degraded"]),
+    ]
+    lines.append(
+        "Pick the projects relevant to the question and call get_project_assets with their ids "
+        "to see their assets. If the summaries already answer the question, answer directly."
+    )
+    lines.append(f"\n--- PROJECTS ({len(data['summaries'])}) ---")
+    for p in data["summaries"]:
+        lines.append(f"[id={p['id']}] {p['project_name']} ({p['year']}): {p['summary'] or '(no summary yet)'}")
+
+    return "\n".join(lines) + "\n"
+
+
+def _pipeline(mode: ContextMode) -> tuple[list[Stage], Callable[[dict[str, Any]], str]]:
+    timeout = get_settings().context_stage_timeout_seconds
+    if mode == "summary":
+        return [
+            Stage("years", _fetch_rollup_years, STATS_STAGE_TIMEOUT_SECONDS, optional=True),
+            Stage("kind_language", _fetch_rollup_kind_language, timeout, optional=True),
+            Stage("projects", _fetch_rollup_projects, timeout),
+        ], _format_summary
+    if mode == "hierarchical":
+        return [Stage("summaries", _fetch_project_summaries, timeout)], _format_hierarchical
+    return [
+        Stage("stats", _fetch_stats, STATS_STAGE_TIMEOUT_SECONDS, optional=True),
+        Stage("projects", _fetch_projects, timeout),
+        Stage("assets", _fetch_asset_lines, timeout),
+    ], _format_full
+
+
+async def _run_stage(
+    stage: Stage, db: Database, filters: QuestionFilters, cache_key: str, degraded: dict[str, str]
+) -> Any:
+    try:
+        result = await asyncio.wait_for(stage.fetch(db, filters), stage.timeout)
+    except Exception as e:
+        fallback = _last_good.get(cache_key)
+        if fallback is None and not stage.optional:
+            raise
+        degraded[stage.name] = f"result from {fallback[1]:.0f}s ago" if fallback is not None else "missing"
+        get_logger().warning(
+            f"Context stage '{stage.name}' degraded ({type(e).__name__}: {e}) - "
+            f"{'using last good result' if fallback is not None else 'skipped'}"
+        )
+        return fallback[0] if fallback is not None else None
+    _last_good.put(cache_key, result)
+    return result
+
+
+async def build_context(db: Database, mode: ContextMode, filters: QuestionFilters | None = None) -> str:
+    """Run the stages of a context mode concurrently and format the result."""
+    filters = filters or QuestionFilters()
+    stages, formatter = _pipeline(mode)
+    degraded: dict[str, str] = {}
+    tasks = [
+        asyncio.ensure_future(_run_stage(stage, db, filters, f"{mode}:{stage.name}:{filters!r}", degraded))
+        for stage in stages
+    ]
+    try:
+        results = await asyncio.gather(*tasks)
+    except BaseException:
+        # A required stage failed (or we were cancelled): stop the other queries too
+        for task in tasks:
+            task.cancel()
+        raise
+    data = {stage.name: result for stage, result in zip(stages, results)}
+    data["filters"] = filters
+    data["degraded"] = {stage.name: degraded[stage.name] for stage in stages if stage.name in degraded}
+    return await asyncio.to_thread(formatter, data)
+
+
+def context_filters(messages: list[ModelMessage]) -> QuestionFilters | None:
+    """
+    The filters the latest database context in messages was built with
+    (empty when unfiltered), or None when there is no context at all.
+    """
+    for message in reversed(messages):
+        if not isinstance(message, ModelRequest):
+            continue
+        for part in reversed(message.parts):
+            if isinstance(part, SystemPromptPart) and any(h in part.content for h in CONTEXT_HEADERS):
+                match = _FILTERS_LINE_RE.search(part.content)
+                return parse_description(match.group(1)) if match else QuestionFilters()
+    return None
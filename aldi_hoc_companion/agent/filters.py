@@ -0,0 +1,207 @@
+"""
+Rule-based extraction of hard constraints from a question.
+
+Years, languages, asset kinds and briefing vs execution are recognised
+from English/Dutch/French keywords and turned into SQL WHERE clauses on
+the typed columns of projects/assets. They are applied before any context
+is built, so constrained questions only pull the matching rows - a false
+match hides exactly the rows the question is about. So a keyword right after
+a negation ("no French assets", "except videos") is not a constraint, a year
+range ("2020 through 2024") keeps every year in it, and an open-ended or
+comparative year ("since 2023", "compared to 2023") sets no year filter.
+"""
+import re
+import unicodedata
+
+from aldi_hoc_companion.models.agent_models import QuestionFilters
+
+_YEAR_RE = re.compile(r"\b(20\d{2})\b")
+# "2020 through 2024", "between 2020 and 2024", "van 2020 tot 2024", "de 2020 a 2024", "2020-2024"
+_YEAR_RANGE_RE = re.compile(
+    r"\b(20\d{2})\s*(?:-|through|thru|to|until|till|tot(?:\s+en\s+met)?|t/m|a|au|jusqu'?(?:a|en))\s*(20\d{2})\b"
+    r"|\b(?:between|tussen|entre)\s+(20\d{2})\s+(?:and|en|et)\s+(20\d{2})\b"
+)
+# "since 2023", "before 2024", "compared to 2023", "sinds 2023", "depuis 2023" - the years
+# meant are not listed, so no year filter
+_YEAR_OPEN_RE = re.compile(
+    r"\b(?:since|before|after|compared\s+(?:to|with)|versus|vs|sinds|sedert|vanaf|na|vergeleken\s+met|"
+    r"tov|depuis|avant|apres|par\s+rapport\s+a|compare\s+a)\s+(?:\w+\s+)?20\d{2}\b"
+)
+# "answer in English", "antwoord in het Nederlands", "reponds en francais" - the reply language, not a filter
+_REPLY_LANGUAGE_RE = re.compile(
+    r"\b(?:answer|reply|respond|antwoord|reageer|reponds|repondez|reponse)\w*\s+(?:\w+\s+){0,2}?(?:in|en)\s+(?:het\s+)?\w+"
+)
+# "no French assets", "not in French", "except videos", "zonder video's", "niet in het Frans",
+# "sans bannieres", "pas d'anglais" - excluded, so no constraint; checked against the text just
+# before a keyword, allowing two words in between ("without any", "niet in het")
+_NEGATION_RE = re.compile(
+    r"\b(?:no|not|without|nor|except|excluding|other\s+than|geen|niet|zonder|noch|behalve|"
+    r"sans|ni|sauf|hors|pas\s+de?)[\s']+(?:\w+\s+){0,2}$"
+)
+
+# Patterns match on the lowercased question with accents stripped
+LANGUAGE_PATTERNS = {
+    "French": r"french|frans\w*|francais\w*|francophone\w*",
+    "Dutch": r"dutch|nederlands\w*|neerlandais\w*|vlaams\w*|flemish",
+    "English": r"english|engels\w*|anglais\w*",
+    "Multilingual": r"multilingual|meertalig\w*|multilingue\w*",
+}
+
+ASSET_KIND_PATTERNS = {
+    "banner": r"banners?|banier\w*|banniere\w*",
+    "video": r"videos?|video's|films?|tv-?spots?",
+    "email": r"e-?mails?|e-?mailings?|nieuwsbrie\w*|newsletters?|courriels?",
+    "photo": r"photos?|foto\w*|pictures?",
+    "document": r"documents?|documenten|pdfs?",
+}
+
+CAMPAIGN_CONTEXT_PATTERNS = {
+    "briefing": r"briefings?",
+    "execution": r"executions?|uitvoering\w*|deliverables?|livrables?",
+}
+
+
+def _compile(patterns: dict[str, str]) -> dict[str, re.Pattern]:
+    return {value: re.compile(rf"\b(?:{pattern})\b") for value, pattern in patterns.items()}
+
+
+_LANGUAGES = _compile(LANGUAGE_PATTERNS)
+_ASSET_KINDS = _compile(ASSET_KIND_PATTERNS)
+_CAMPAIGN_CONTEXTS = _compile(CAMPAIGN_CONTEXT_PATTERNS)
+
+
+def _normalize(text: str) -> str:
+    """Lowercase and strip accents (bannières -> bannieres, vidéo -> video)."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def _mentions(pattern: re.Pattern, text: str) -> bool:
+    """True if the keyword occurs at least once without a negation in front of it."""
+    return any(not _NEGATION_RE.search(text, 0, match.start()) for match in pattern.finditer(text))
+
+
+def _years(text: str) -> tuple[int, ...]:
+    if _YEAR_OPEN_RE.search(text):
+        return ()
+    years = {int(year) for year in _YEAR_RE.findall(text)}
+    for match in _YEAR_RANGE_RE.finditer(text):
+        first, last = sorted(int(year) for year in match.groups() if year)
+        years.update(range(first, last + 1))
+    return tuple(sorted(years))
+
+
+def extract_filters(question: str) -> QuestionFilters:
+    text = _REPLY_LANGUAGE_RE.sub(" ", _normalize(question))
+    contexts = [value for value, pattern in _CAMPAIGN_CONTEXTS.items() if _mentions(pattern, text)]
+    return QuestionFilters(
+        years=_years(text),
+        languages=tuple(value for value, pattern in _LANGUAGES.items() if _mentions(pattern, text)),
+        asset_kinds=tuple(value for value, pattern in _ASSET_KINDS.items() if _mentions(pattern, text)),
+        # Asking about both is no constraint at all
+        campaign_context=contexts[0] if len(contexts) == 1 else None,
+    )
+
+
+def asset_where(filters: QuestionFilters, alias: str = "a", with_context: bool = True) -> tuple[str, list]:
+    """
+    WHERE clause (without the keyword) for the asset constraints, and its params.
+
+    A language filter also keeps Multilingual assets, which contain every language.
+    """
+    clauses, params = [], []
+    if filters.languages:
+        clauses.append(f"{alias}.language = ANY(%s)")
+        params.append(sorted({*filters.languages, "Multilingual"}))
+    if filters.asset_kinds:
+        clauses.append(f"lower({alias}.asset_kind) = ANY(%s)")
+        params.append(list(filters.asset_kinds))
+    if with_context and filters.campaign_context:
+        clauses.append(f"{alias}.campaign_context = %s")
+        params.append(filters.campaign_context)
+    return " AND ".join(clauses) or "TRUE", params
+
+
+def project_where(filters: QuestionFilters, alias: str = "p", id_column: str = "id") -> tuple[str, list]:
+    """
+    WHERE clause for projects: the year constraint, plus - when there are
+    asset constraints - the requirement to have at least one matching asset.
+    """
+    clauses, params = [], []
+    if filters.years:
+        clauses.append(f"{alias}.year = ANY(%s)")
+        params.append(list(filters.years))
+    if filters.has_asset_filters:
+        assets_clause, assets_params = asset_where(filters, alias="fa")
+        clauses.append(
+            f"EXISTS (SELECT 1 FROM assets fa WHERE fa.project_id = {alias}.{id_column} AND {assets_clause})"
+        )
+        params.extend(assets_params)
+    return " AND ".join(clauses) or "TRUE", params
+
+
+def facets_where(filters: QuestionFilters, alias: str = "r") -> tuple[str, list]:
+    """WHERE clause for rollup_project_facets: every constraint on its own columns, no subquery."""
+    clauses, params = [], []
+    if filters.years:
+        clauses.append(f"{alias}.year = ANY(%s)")
+        params.append(list(filters.years))
+    if filters.has_asset_filters:
+        assets_clause, assets_params = asset_where(filters, alias=alias)
+        clauses.append(assets_clause)
+        params.extend(assets_params)
+    return " AND ".join(clauses) or "TRUE", params
+
+
+def describe(filters: QuestionFilters) -> str:
+    """Human-readable summary for the prompt, e.g. "year 2024; language French; asset kind banner"."""
+    parts = []
+    if filters.years:
+        parts.append("year " + ", ".join(map(str, filters.years)))
+    if filters.languages:
+        parts.append("language " + ", ".join(filters.languages))
+    if filters.asset_kinds:
+        parts.append("asset kind " + ", ".join(filters.asset_kinds))
+    if filters.campaign_context:
+        parts.append(f"campaign context {filters.campaign_context}")
+    return "; ".join(parts)
+
+
+_DESCRIBE_LABELS = {
+    "year ": "years", "language ": "languages", "asset kind ": "asset_kinds", "campaign context ": "campaign_context",
+}
+
+
+def parse_description(text: str) -> QuestionFilters:
+    """Inverse of describe(): the filters a context was built with, read back from its prompt line."""
+    values: dict[str, str] = {}
+    for part in filter(None, text.strip().split("; ")):
+        for label, name in _DESCRIBE_LABELS.items():
+            if part.startswith(label):
+                values[name] = part[len(label):]
+    return QuestionFilters(
+        years=tuple(int(year) for year in values["years"].split(", ")) if "years" in values else (),
+        languages=tuple(values["languages"].split(", ")) if "languages" in values else (),
+        asset_kinds=tuple(values["asset_kinds"].split(", ")) if "asset_kinds" in values else (),
+        campaign_context=values.get("campaign_context"),
+    )
+
+
+def covers(built_for: QuestionFilters, filters: QuestionFilters) -> bool:
+    """
+    Whether a context built for built_for holds every row that filters asks for:
+    on each dimension it is unconstrained, or filters narrows it further.
+    No filters at all is a follow-up on the context as it is.
+    """
+    if not filters:
+        return True
+
+    def within(wide: tuple, narrow: tuple) -> bool:
+        return not wide or (bool(narrow) and set(narrow) <= set(wide))
+
+    return (
+        within(built_for.years, filters.years)
+        and within(built_for.languages, filters.languages)
+        and within(built_for.asset_kinds, filters.asset_kinds)
+        and built_for.campaign_context in (None, filters.campaign_context)
+    )
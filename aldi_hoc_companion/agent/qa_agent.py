@@ -1,7 +1,17 @@
+import asyncio
+
 from pydantic_ai import Agent, RunContext
+from pydantic_ai.messages import ModelMessage, ModelRequest, SystemPromptPart
+from pydantic_ai.tools import ToolDefinition
 from pydantic_ai.usage import UsageLimits
 
-from aldi_hoc_companion.core.config import get_settings
+from aldi_hoc_companion.agent.context import build_context, cluster_key, context_filters, variants_note
+from aldi_hoc_companion.agent.filters import asset_where, covers, extract_filters
+from aldi_hoc_companion.agent.resilience import get_resilient_model, track_calls
+from aldi_hoc_companion.agent.prompts import SYSTEM_PROMPT as ANALYST_PROMPT
+from aldi_hoc_companion.agent.sessions import FOLLOW_UP_CONTEXT_NOTE, compact_history, get_session_store
+from aldi_hoc_companion.core.ai_models import MODEL_PRICING
+from aldi_hoc_companion.core.config import ContextMode, PromptVariant, get_settings
 from aldi_hoc_companion.db import Database
 from aldi_hoc_companion.models.agent_models import AgentDeps, AgentResponse, QueryResult, TokenUsage
 
@@ -12,66 +22,137 @@ The database content is provided below - analyze it to answer the user's questio
 Think semantically - if user asks about anything, field values that are shown to you.
 Answer in the user's language. Be specific with examples from the data."""
 
+# Base prompts selectable per request (AgentDeps.prompt / SYSTEM_PROMPT_VARIANT)
+SYSTEM_PROMPTS: dict[str, str] = {
+    "inline": SYSTEM_PROMPT,
+    "analyst": ANALYST_PROMPT,
+}
+
 agent = Agent(
     _settings.pydantic_ai_model_string,
     deps_type=AgentDeps,
-    system_prompt=SYSTEM_PROMPT,
 )
 
+@agent.system_prompt
+def base_prompt(ctx: RunContext[AgentDeps]) -> str:
+    return SYSTEM_PROMPTS[ctx.deps.prompt]
+
+
 @agent.system_prompt
 async def add_database_content(ctx: RunContext[AgentDeps]) -> str:
-    """Load ALL database content into context."""
-    db = ctx.deps.db
-    
-    # Get all projects
-    projects = await db.execute("SELECT project_id, project_name, year FROM projects ORDER BY year DESC")
-    
-    # Get asset summaries with content descriptions
-    assets = await db.execute("""
-        SELECT p.project_name, p.year, a.asset_kind, a.asset_content, a.language, a.file_name, a.description, a.version, a.document_content, a.campaign_context
-        FROM assets a 
+    """Load the database content for the context mode into context."""
+    return await build_context(ctx.deps.db, ctx.deps.context_mode, ctx.deps.filters)
+
+
+async def _only_hierarchical(ctx: RunContext[AgentDeps], tool_def: ToolDefinition) -> ToolDefinition | None:
+    return tool_def if ctx.deps.context_mode == "hierarchical" else None
+
+
+# Upper bound on projects fetched in one drill-down call
+MAX_DRILLDOWN_PROJECTS = 10
+
+
+@agent.tool(prepare=_only_hierarchical)
+async def get_project_assets(ctx: RunContext[AgentDeps], project_ids: list[int]) -> str:
+    """Get the assets of the selected projects.
+
+    Args:
+        project_ids: ids of the relevant projects (the `id=` values from the project summaries), at most 10.
+    """
+    where, params = asset_where(ctx.deps.filters)
+    group_key = await cluster_key(ctx.deps.db)
+    # One row per near-duplicate cluster, like the full context
+    assets = await ctx.deps.db.execute(f"""
+        SELECT p.project_name, p.year,
+               (array_agg(a.asset_kind ORDER BY a.id))[1] AS asset_kind,
+               (array_agg(a.language ORDER BY a.id))[1] AS language,
+               (array_agg(a.campaign_context ORDER BY a.id))[1] AS campaign_context,
+               array_agg(a.asset_content ORDER BY a.id) AS contents,
+               COUNT(*) AS variant_count,
+               string_agg(DISTINCT a.language, ', ') AS languages,
+               string_agg(DISTINCT a.version, ', ') AS versions
+        FROM assets a
         JOIN projects p ON a.project_id = p.id
-        ORDER BY p.year DESC, p.project_name
-    """)
-    
-    # Get stats
-    stats = await db.execute("""
-        SELECT 
-            (SELECT COUNT(*) FROM projects) as total_projects,
-            (SELECT COUNT(*) FROM assets) as total_assets
-    """)
-    
-    # Format for LLM
-    content = f"\n\n=== DATABASE CONTENT ===\n"
-    content += f"\nSTATS: {stats[0]['total_projects']} projects, {stats[0]['total_assets']} assets\n"
-    
-    content += f"\n--- PROJECTS ({len(projects)}) ---\n"
-    for p in projects:
-        content += f"- {p['project_name']} ({p['year']})\n"
-    
-    content += f"\n--- ALL ASSETS ({len(assets)}) ---\n"
+        WHERE p.id = ANY(%s) AND {where}
+        GROUP BY p.id, p.year, p.project_name, {group_key}
+        ORDER BY p.year DESC, p.project_name, MIN(a.id)
+    """, (project_ids[:MAX_DRILLDOWN_PROJECTS], *params))
+
+    lines = [f"ASSETS ({len(assets)}):"]
     for a in assets:
-        desc = str(a.get('asset_content', ''))
-        content += f"[{a['asset_kind']}] {a['project_name']}: {desc}\n"
-    
-    return content
+        lines.append(
+            f"[{a['asset_kind']}|{a['language']}|{a['campaign_context']}] "
+            f"{a['project_name']} ({a['year']}): {a['contents'][0] or ''}"
+            f"{variants_note(a['variant_count'], a['languages'], a['versions'], a['contents'])}"
+        )
+    return "\n".join(lines)
+
 
+async def _refresh_context(history: list[ModelMessage], deps: AgentDeps) -> list[ModelMessage]:
+    """
+    Follow-ups reuse the stored history, including the database context (pydantic-ai
+    only adds system prompts to a new conversation). Only when the follow-up asks for
+    rows the latest context does not hold ("and 2023?" after a 2024 context) is a
+    context built for its filters appended; a follow-up without filters inherits it.
+    """
+    built_for = context_filters(history)
+    if built_for is None or covers(built_for, deps.filters):
+        return history
+    context = await build_context(deps.db, deps.context_mode, deps.filters)
+    return [*history, ModelRequest(parts=[SystemPromptPart(content=f"{FOLLOW_UP_CONTEXT_NOTE}{context}")])]
 
-async def ask(question: str) -> AgentResponse:
+
+async def ask(
+    question: str,
+    context_mode: ContextMode | None = None,
+    session_id: str | None = None,
+    prompt: PromptVariant | None = None,
+    model: str | None = None,
+) -> AgentResponse:
     settings = get_settings()
+    model = model or settings.openai_model
     db = Database()
-    deps = AgentDeps(db=db, question=question)
-    
-    # Just 1 API call - no tools, all data in context
-    result = await agent.run(question, deps=deps, usage_limits=UsageLimits(request_limit=2))
+    deps = AgentDeps(
+        db=db,
+        question=question,
+        context_mode=context_mode or settings.context_mode,
+        prompt=prompt or settings.system_prompt_variant,
+        filters=extract_filters(question),
+    )
+
+    # Follow-ups reuse the stored history and its database context, unless it lacks the rows they ask for
+    store = get_session_store()
+    history: list[ModelMessage] = []
+    if session_id:
+        # The stores may block (SQLite I/O, serialization) - keep that off the event loop
+        history = await _refresh_context(await asyncio.to_thread(store.load, session_id), deps)
+
+    # Just 1 API call - no tools, all data in context.
+    # Hierarchical mode needs extra requests for the get_project_assets drill-down.
+    request_limit = 4 if deps.context_mode == "hierarchical" else 2
+    with track_calls() as calls:
+        result = await agent.run(
+            question,
+            deps=deps,
+            model=get_resilient_model(model),
+            message_history=history or None,
+            usage_limits=UsageLimits(request_limit=request_limit),
+        )
+
+    if session_id:
+        await asyncio.to_thread(
+            store.save, session_id, compact_history(result.all_messages(), settings.session_token_budget)
+        )
     
     answer = str(result.output) if result.output else ""
     
-    usage = result.usage()
-    input_tokens = usage.request_tokens or 0
-    output_tokens = usage.response_tokens or 0
-    input_cost = input_tokens * settings.model_input_cost_per_token
-    output_cost = output_tokens * settings.model_output_cost_per_token
+    usage = result.usage
+    input_tokens = usage.input_tokens or 0
+    output_tokens = usage.output_tokens or 0
+    # Hedged/failed-over requests were answered (and billed) by the fallback model
+    tokens_by_model = calls.tokens_by_model or {model: [input_tokens, output_tokens]}
+    input_cost = sum(t[0] * MODEL_PRICING[m]["input_per_million"] for m, t in tokens_by_model.items()) / 1_000_000
+    output_cost = sum(t[1] * MODEL_PRICING[m]["output_per_million"] for m, t in tokens_by_model.items()) / 1_000_000
     
     token_usage = TokenUsage(
         input_tokens=input_tokens,
@@ -80,8 +161,18 @@ async def ask(question: str) -> AgentResponse:
         input_cost_usd=round(input_cost, 6),
         output_cost_usd=round(output_cost, 6),
         total_cost_usd=round(input_cost + output_cost, 6),
-        model=settings.openai_model,
+        model=model,
+        retries=calls.retries,
+        hedges=calls.hedges,
+        hedge_wins=calls.hedge_wins,
+        failovers=calls.failovers,
+        extra_cost_usd=round(calls.extra_cost_usd, 6),
     )
     
     query_result = QueryResult(answer=answer)
-    return AgentResponse(result=query_result, usage=token_usage)
+    return AgentResponse(
+        result=query_result,
+        usage=token_usage,
+        session_id=session_id,
+        db_stats=db.get_db_stats(),
+    )
@@ -0,0 +1,252 @@
+"""
+Timeouts, retries, hedging and failover for model requests.
+
+ResilientModel wraps the primary model. Every request attempt runs under a
+timeout. Transient errors (429, 5xx, connection errors, timeouts) are
+retried with jittered exponential backoff. With a fallback model configured:
+
+- hedge: once the primary has been running longer than its recent p95
+  latency, the same request goes to the fallback and the first response
+  wins; the other call is cancelled. Cancelled and timed-out primary calls
+  count towards that latency with their elapsed time.
+- failover: when the primary gives up, the fallback is tried.
+
+Streaming requests are passed through unchanged. Retry/hedge counts and the
+estimated cost of abandoned calls are collected per agent run with
+track_calls().
+"""
+import asyncio
+import math
+import random
+from collections import deque
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from functools import lru_cache
+from itertools import count
+from time import perf_counter
+
+from pydantic_ai.exceptions import ModelAPIError, ModelHTTPError
+from pydantic_ai.messages import ModelMessage, ModelResponse
+from pydantic_ai.models import Model, ModelRequestParameters, infer_model
+from pydantic_ai.models.wrapper import WrapperModel
+from pydantic_ai.settings import ModelSettings
+
+from aldi_hoc_companion.core.ai_models import MODEL_PRICING
+from aldi_hoc_companion.core.config import get_settings
+from aldi_hoc_companion.core.logging import get_logger
+
+# Primary latencies kept for the hedge deadline
+LATENCY_WINDOW = 200
+
+
+class ModelUnavailableError(Exception):
+    """Every model attempt failed with a transient error or timed out."""
+
+    def __init__(self, message: str, timed_out: bool):
+        super().__init__(message)
+        self.timed_out = timed_out
+
+
+@dataclass
+class CallStats:
+    """Resilience counters for one agent run."""
+    retries: int = 0
+    hedges: int = 0  # hedge calls started
+    hedge_wins: int = 0  # requests answered by the hedge
+    failovers: int = 0  # requests sent to the fallback after the primary gave up
+    extra_cost_usd: float = 0.0  # estimated prompt cost of abandoned calls
+    tokens_by_model: dict[str, list[int]] = field(default_factory=dict)  # model -> [input, output]
+
+
+_call_stats: ContextVar[CallStats | None] = ContextVar("call_stats", default=None)
+
+
+@contextmanager
+def track_calls() -> Iterator[CallStats]:
+    """Collect CallStats for the model requests made inside the block."""
+    stats = CallStats()
+    token = _call_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _call_stats.reset(token)
+
+
+def is_transient(error: BaseException) -> bool:
+    if isinstance(error, ModelHTTPError):
+        return error.status_code in (408, 429) or error.status_code >= 500
+    # Connection errors and client-side timeouts
+    return isinstance(error, (ModelAPIError, TimeoutError))
+
+
+def backoff_delay(attempt: int, base: float, maximum: float) -> float:
+    """Full jitter: uniform in [0, min(maximum, base * 2**attempt)]."""
+    return random.uniform(0, min(maximum, base * 2 ** attempt))
+
+
+def input_cost_usd(model: str, input_tokens: int) -> float:
+    pricing = MODEL_PRICING.get(model)
+    return input_tokens * pricing["input_per_million"] / 1_000_000 if pricing else 0.0
+
+
+class ResilientModel(WrapperModel):
+
+    def __init__(
+        self,
+        wrapped: Model | str,
+        fallback: Model | str | None = None,
+        timeout: float = 60.0,
+        max_retries: int = 2,
+        retry_base_delay: float = 0.5,
+        retry_max_delay: float = 8.0,
+        hedge_percentile: float = 95.0,
+        hedge_min_samples: int = 20,
+        hedge_initial_delay: float = 10.0,
+    ):
+        super().__init__(wrapped)
+        self.fallback = infer_model(fallback) if fallback is not None else None
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_initial_delay = hedge_initial_delay
+        self._latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def hedge_delay(self) -> float:
+        """Seconds before the hedge starts: nearest-rank percentile of recent primary latencies."""
+        if len(self._latencies) < self.hedge_min_samples:
+            return self.hedge_initial_delay
+        latencies = sorted(self._latencies)
+        return latencies[max(0, math.ceil(self.hedge_percentile / 100 * len(latencies)) - 1)]
+
+    async def _request_with_retries(
+        self,
+        model: Model,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+        stats: CallStats,
+        abandoned: list[str],
+    ) -> ModelResponse:
+        for attempt in count():
+            start = perf_counter()
+            try:
+                response = await asyncio.wait_for(
+                    model.request(messages, model_settings, model_request_parameters), self.timeout
+                )
+            except asyncio.CancelledError:
+                # Lost to the hedge: it took at least this long. Leaving it out
+                # would keep only the fast calls and pull the deadline down
+                self._sample_latency(model, start)
+                raise
+            except Exception as e:
+                if isinstance(e, TimeoutError):
+                    self._sample_latency(model, start)
+                    abandoned.append(model.model_name)
+                if not is_transient(e) or attempt >= self.max_retries:
+                    raise
+                stats.retries += 1
+                get_logger().warning(
+                    f"Model {model.model_name} attempt {attempt + 1} failed ({type(e).__name__}: {e}) - retrying"
+                )
+                await asyncio.sleep(backoff_delay(attempt, self.retry_base_delay, self.retry_max_delay))
+                continue
+            self._sample_latency(model, start)
+            return response
+
+    def _sample_latency(self, model: Model, start: float) -> None:
+        """Primary latency for the hedge deadline; a cancelled or timed-out call counts with its elapsed time."""
+        if model is self.wrapped:
+            self._latencies.append(perf_counter() - start)
+
+    async def request(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+    ) -> ModelResponse:
+        stats = _call_stats.get() or CallStats()
+        abandoned: list[str] = []  # calls that sent the prompt but were given up on
+
+        def start(model: Model) -> asyncio.Task:
+            return asyncio.ensure_future(self._request_with_retries(
+                model, messages, model_settings, model_request_parameters, stats, abandoned
+            ))
+
+        running: dict[asyncio.Task, Model] = {start(self.wrapped): self.wrapped}
+        hedged = failed_over = False
+        errors: list[BaseException] = []
+        try:
+            if self.fallback is not None:
+                done, _ = await asyncio.wait(running, timeout=self.hedge_delay())
+                if not done:
+                    stats.hedges += 1
+                    hedged = True
+                    running[start(self.fallback)] = self.fallback
+
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    model = running.pop(task)
+                    if task.exception() is not None:
+                        errors.append(task.exception())
+                        continue
+                    response = task.result()
+                    if hedged and model is self.fallback:
+                        stats.hedge_wins += 1
+                    abandoned.extend(m.model_name for m in running.values())
+                    self._record(stats, model, response, abandoned)
+                    return response
+
+                if not running and self.fallback is not None and not (hedged or failed_over):
+                    if not all(is_transient(e) for e in errors):
+                        break
+                    stats.failovers += 1
+                    failed_over = True
+                    get_logger().warning(
+                        f"Model {self.wrapped.model_name} unavailable - failing over to {self.fallback.model_name}"
+                    )
+                    running[start(self.fallback)] = self.fallback
+        finally:
+            for task in running:
+                task.cancel()
+
+        # Non-transient errors (bad request, auth, ...) are surfaced as they are
+        for error in errors:
+            if not is_transient(error):
+                raise error
+        timed_out = all(isinstance(e, TimeoutError) for e in errors)
+        raise ModelUnavailableError(
+            f"No model answered ({', '.join(f'{type(e).__name__}: {e}' for e in errors)})", timed_out=timed_out
+        ) from errors[-1]
+
+    @staticmethod
+    def _record(stats: CallStats, model: Model, response: ModelResponse, abandoned: list[str]) -> None:
+        input_tokens = response.usage.input_tokens or 0
+        tokens = stats.tokens_by_model.setdefault(model.model_name, [0, 0])
+        tokens[0] += input_tokens
+        tokens[1] += response.usage.output_tokens or 0
+        # An abandoned call was sent the same prompt; its output tokens are unknown
+        stats.extra_cost_usd += sum(input_cost_usd(name, input_tokens) for name in abandoned)
+
+
+@lru_cache()
+def get_resilient_model(model: str) -> ResilientModel:
+    """Resilient wrapper for a MODEL_PRICING model, with the configured fallback (if different)."""
+    settings = get_settings()
+    fallback = settings.llm_fallback_model if settings.llm_fallback_model != model else None
+    return ResilientModel(
+        f"openai:{model}",
+        fallback=f"openai:{fallback}" if fallback else None,
+        timeout=settings.llm_timeout_seconds,
+        max_retries=settings.llm_max_retries,
+        retry_base_delay=settings.llm_retry_base_delay_seconds,
+        retry_max_delay=settings.llm_retry_max_delay_seconds,
+        hedge_percentile=settings.llm_hedge_percentile,
+        hedge_min_samples=settings.llm_hedge_min_samples,
+        hedge_initial_delay=settings.llm_hedge_initial_delay_seconds,
+    )
@@ -0,0 +1,275 @@
+"""
+Server-side chat history for multi-turn sessions.
+
+The first request of a session carries the system prompt (including the
+database context), so follow-ups reuse it instead of rebuilding it. Older
+turns are compacted into a short digest once the conversation exceeds the
+configured token budget; the original system prompt always stays first so
+the prompt prefix remains stable for provider-side caching. A follow-up
+that needs other rows gets a refreshed context (FOLLOW_UP_CONTEXT_NOTE);
+only the latest one is kept, and it counts towards the budget.
+"""
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import replace
+from functools import lru_cache
+
+from pydantic_ai.messages import (
+    ModelMessage,
+    ModelMessagesTypeAdapter,
+    ModelRequest,
+    ModelResponse,
+    SystemPromptPart,
+    TextPart,
+    UserPromptPart,
+)
+
+from aldi_hoc_companion.core.config import get_settings
+
+# Rough chars-per-token ratio used for budget estimates
+CHARS_PER_TOKEN = 4
+# Digest of compacted turns: header, chars kept per question/answer, max entries
+DIGEST_HEADER = "Summary of earlier turns in this conversation:"
+DIGEST_CHARS = 200
+DIGEST_MAX_TURNS = 20
+# Opens a database context appended for a follow-up (see qa_agent._refresh_context)
+FOLLOW_UP_CONTEXT_NOTE = (
+    "The follow-up question asks for data the earlier database context does not contain. "
+    "Use this updated database context instead of the earlier one:"
+)
+
+
+class SessionStore(ABC):
+    """Stores the message history of each session."""
+
+    @abstractmethod
+    def load(self, session_id: str) -> list[ModelMessage]:
+        """Return the stored history, or an empty list for unknown sessions."""
+
+    @abstractmethod
+    def save(self, session_id: str, messages: list[ModelMessage]) -> None:
+        """Replace the stored history of a session."""
+
+
+def history_size(messages: list[ModelMessage]) -> int:
+    """Approximate size in bytes (characters) of a history, system prompts included."""
+    return sum(
+        len(str(getattr(part, "content", "") or getattr(part, "args", "") or ""))
+        for message in messages
+        for part in message.parts
+    )
+
+
+class InMemorySessionStore(SessionStore):
+    """
+    Process-local LRU store. Least recently used sessions are evicted beyond
+    max_sessions or once the histories together exceed max_bytes - each one
+    holds its database context, which can be the whole catalogue.
+    """
+
+    def __init__(self, max_sessions: int = 1000, max_bytes: int = 64 * 1024 * 1024):
+        self._max_sessions = max_sessions
+        self._max_bytes = max_bytes
+        self._sessions: OrderedDict[str, tuple[int, list[ModelMessage]]] = OrderedDict()  # id -> (size, messages)
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def load(self, session_id: str) -> list[ModelMessage]:
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                return []
+            self._sessions.move_to_end(session_id)
+            return list(entry[1])
+
+    def save(self, session_id: str, messages: list[ModelMessage]) -> None:
+        size = history_size(messages)
+        with self._lock:
+            previous = self._sessions.pop(session_id, None)
+            if previous is not None:
+                self._total_bytes -= previous[0]
+            self._sessions[session_id] = (size, list(messages))
+            self._total_bytes += size
+            # The session just saved is always kept
+            while len(self._sessions) > 1 and (
+                len(self._sessions) > self._max_sessions or self._total_bytes > self._max_bytes
+            ):
+                _, (evicted_size, _) = self._sessions.popitem(last=False)
+                self._total_bytes -= evicted_size
+
+
+class SQLiteSessionStore(SessionStore):
+    """SQLite-backed store, shared between workers and kept across restarts."""
+
+    def __init__(self, path: str, max_sessions: int = 1000, max_bytes: int = 64 * 1024 * 1024):
+        self._max_sessions = max_sessions
+        self._max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                session_id TEXT PRIMARY KEY,
+                messages BLOB NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def load(self, session_id: str) -> list[ModelMessage]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT messages FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+        if row is None:
+            return []
+        return ModelMessagesTypeAdapter.validate_json(row[0])
+
+    def save(self, session_id: str, messages: list[ModelMessage]) -> None:
+        payload = ModelMessagesTypeAdapter.dump_json(messages)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sessions (session_id, messages, updated_at) VALUES (?, ?, ?)",
+                (session_id, payload, time.time()),
+            )
+            # Keep the most recent sessions up to max_sessions and max_bytes (the newest one always)
+            self._conn.execute(
+                """
+                DELETE FROM sessions WHERE session_id IN (
+                    SELECT session_id FROM (
+                        SELECT session_id,
+                               ROW_NUMBER() OVER (ORDER BY updated_at DESC) AS position,
+                               SUM(length(messages)) OVER (ORDER BY updated_at DESC) AS total_bytes
+                        FROM sessions
+                    )
+                    WHERE position > 1 AND (position > ? OR total_bytes > ?)
+                )
+                """,
+                (self._max_sessions, self._max_bytes),
+            )
+            self._conn.commit()
+
+
+@lru_cache()
+def get_session_store() -> SessionStore:
+    settings = get_settings()
+    if settings.session_backend == "sqlite":
+        return SQLiteSessionStore(
+            str(settings.session_sqlite_path), settings.session_max_sessions, settings.session_max_bytes
+        )
+    return InMemorySessionStore(settings.session_max_sessions, settings.session_max_bytes)
+
+
+# -----------------------
+# Compaction
+# -----------------------
+def _is_refreshed_context(part) -> bool:
+    return isinstance(part, SystemPromptPart) and part.content.startswith(FOLLOW_UP_CONTEXT_NOTE)
+
+
+def _estimate_tokens(messages: list[ModelMessage]) -> int:
+    """Estimate tokens of the conversation, excluding the original system prompt."""
+    chars = 0
+    for message in messages:
+        for part in message.parts:
+            if isinstance(part, SystemPromptPart) and not _is_refreshed_context(part):
+                continue
+            chars += len(str(getattr(part, "content", "") or getattr(part, "args", "") or ""))
+    return chars // CHARS_PER_TOKEN
+
+
+def _split_turns(messages: list[ModelMessage]) -> list[list[ModelMessage]]:
+    """
+    Group messages into turns; a turn starts at a request with a user or
+    system prompt (e.g. a refreshed context) that does not follow another request.
+    """
+    turns: list[list[ModelMessage]] = []
+    for message in messages:
+        starts_turn = (
+            isinstance(message, ModelRequest)
+            and any(isinstance(part, (UserPromptPart, SystemPromptPart)) for part in message.parts)
+            and not (turns and isinstance(turns[-1][-1], ModelRequest))
+        )
+        if starts_turn or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def _digest(turns: list[list[ModelMessage]], earlier: list[str]) -> str:
+    entries = list(earlier)
+    for turn in turns:
+        question = next(
+            (str(p.content) for m in turn if isinstance(m, ModelRequest)
+             for p in m.parts if isinstance(p, UserPromptPart)),
+            "",
+        )
+        answer = next(
+            (p.content for m in reversed(turn) if isinstance(m, ModelResponse)
+             for p in m.parts if isinstance(p, TextPart)),
+            "",
+        )
+        question, answer = " ".join(question.split()), " ".join(answer.split())
+        entries.append(f"- Q: {question[:DIGEST_CHARS]} | A: {answer[:DIGEST_CHARS]}")
+    return "\n".join([DIGEST_HEADER, *entries[-DIGEST_MAX_TURNS:]])
+
+
+def _drop_stale_contexts(messages: list[ModelMessage]) -> list[ModelMessage]:
+    """Keep only the latest refreshed context; earlier ones contradict it."""
+    refreshed = [part for message in messages for part in message.parts if _is_refreshed_context(part)]
+    if len(refreshed) <= 1:
+        return messages
+    kept: list[ModelMessage] = []
+    for message in messages:
+        parts = [part for part in message.parts if not _is_refreshed_context(part) or part is refreshed[-1]]
+        if len(parts) == len(message.parts):
+            kept.append(message)
+        elif parts:
+            kept.append(replace(message, parts=parts))
+    return kept
+
+
+def compact_history(messages: list[ModelMessage], token_budget: int) -> list[ModelMessage]:
+    """
+    Drop the oldest turns until the conversation fits in token_budget.
+
+    Dropped turns are replaced by a short Q/A digest placed right after the
+    original system prompt, followed by the latest refreshed context if it
+    was in a dropped turn. The most recent turn is always kept.
+    """
+    messages = _drop_stale_contexts(messages)
+    if _estimate_tokens(messages) <= token_budget:
+        return messages
+
+    turns = _split_turns(messages)
+    dropped: list[list[ModelMessage]] = []
+
+    def carried() -> list[SystemPromptPart]:
+        """The refreshed context of the dropped turns, which moves into the head."""
+        return [p for t in dropped for m in t for p in m.parts if _is_refreshed_context(p)]
+
+    while len(turns) > 1 and (
+        _estimate_tokens([ModelRequest(parts=carried()), *[m for t in turns for m in t]]) > token_budget
+    ):
+        dropped.append(turns.pop(0))
+    if not dropped:
+        return messages
+
+    system_parts: list[SystemPromptPart] = []
+    earlier: list[str] = []
+    for part in messages[0].parts:
+        if not isinstance(part, SystemPromptPart) or _is_refreshed_context(part):
+            continue
+        if part.content.startswith(DIGEST_HEADER):
+            earlier = part.content.splitlines()[1:]
+        else:
+            system_parts.append(part)
+
+    # The first kept turn keeps its own system parts (a context refreshed for that turn)
+    first, *rest = turns[0]
+    head = ModelRequest(
+        parts=[*system_parts, SystemPromptPart(content=_digest(dropped, earlier)), *carried(), *first.parts]
+    )
+    return [head, *rest, *[m for t in turns[1:] for m in t]]
@@ -0,0 +1,158 @@
+"""
+Offline job that writes one summary paragraph per project to project_summaries.
+
+Summaries are keyed by a content hash, so only new or changed projects are
+sent to the LLM. Projects too large for one call are summarized map-reduce:
+token-bounded chunks of assets are condensed into notes (map), and the
+notes - condensed again while they are still too large - are turned into
+the summary (reduce). Run after ingestion:
+
+    python -m aldi_hoc_companion.agent.summaries
+"""
+import asyncio
+from typing import Any
+
+from pydantic_ai import Agent
+
+from aldi_hoc_companion.agent.sessions import CHARS_PER_TOKEN
+from aldi_hoc_companion.core.config import get_settings
+from aldi_hoc_companion.core.logging import get_logger
+from aldi_hoc_companion.db import Database
+
+_settings = get_settings()
+
+SUMMARY_PROMPT = """You summarize Aldi marketing campaigns.
+You get the assets of ONE project. Write a single paragraph (max 120 words) covering:
+the campaign theme, products and themes shown, asset kinds, languages and whether it has briefing and/or execution material.
+Mention concrete product names and keywords (English and Dutch) so the project can be found by search."""
+
+CHUNK_PROMPT = """You take notes on part of the assets of ONE Aldi marketing project.
+Write compact bullet notes (max 150 words) of the campaign themes, concrete products, asset kinds,
+languages and briefing/execution material in this part. Keep product names and keywords verbatim."""
+
+# Per-asset cap on extracted document text sent to the summarizer
+DOCUMENT_CHARS = 1500
+# Input size of one LLM call, well inside the model's context window
+CHUNK_TOKENS = 8000
+
+summary_agent = Agent(_settings.pydantic_ai_model_string, system_prompt=SUMMARY_PROMPT)
+chunk_agent = Agent(_settings.pydantic_ai_model_string, system_prompt=CHUNK_PROMPT)
+
+PROJECT_HASHES_SQL = """
+    SELECT p.id, p.project_name, p.year, s.content_hash AS stored_hash,
+           md5(
+               p.project_name || '|' || p.year || '|' ||
+               COALESCE(string_agg(
+                   concat_ws('|', a.asset_kind, a.language, a.campaign_context,
+                             COALESCE(a.asset_content, ''), COALESCE(a.document_content, '')),
+                   '||' ORDER BY a.id
+               ), '')
+           ) AS content_hash
+    FROM projects p
+    LEFT JOIN assets a ON a.project_id = p.id
+    LEFT JOIN project_summaries s ON s.project_id = p.id
+    GROUP BY p.id, p.project_name, p.year, s.content_hash
+"""
+
+PROJECT_ASSETS_SQL = """
+    SELECT asset_kind, language, campaign_context, asset_content, left(document_content, %s) AS document_content
+    FROM assets
+    WHERE project_id = %s
+    ORDER BY id
+"""
+
+UPSERT_SUMMARY_SQL = """
+    INSERT INTO project_summaries (project_id, content_hash, summary, model, updated_at)
+    VALUES (%s, %s, %s, %s, now())
+    ON CONFLICT (project_id) DO UPDATE
+    SET content_hash = EXCLUDED.content_hash,
+        summary = EXCLUDED.summary,
+        model = EXCLUDED.model,
+        updated_at = now()
+"""
+
+
+def _format_asset(a: dict[str, Any]) -> str:
+    line = f"[{a['asset_kind']}|{a['language']}|{a['campaign_context']}] {a['asset_content'] or ''}"
+    if a["document_content"]:
+        line += f"\n  document: {a['document_content']}"
+    return line
+
+
+def _chunk(items: list[str], max_chars: int) -> list[list[str]]:
+    """Split items into consecutive chunks of at most max_chars (an oversized item gets a chunk of its own)."""
+    chunks: list[list[str]] = [[]]
+    size = 0
+    for item in items:
+        if chunks[-1] and size + len(item) > max_chars:
+            chunks.append([])
+            size = 0
+        chunks[-1].append(item)
+        size += len(item) + 1
+    return chunks
+
+
+async def _run(agent: Agent, prompt: str, semaphore: asyncio.Semaphore) -> str:
+    async with semaphore:
+        result = await agent.run(prompt)
+    return str(result.output)
+
+
+async def _summarize_assets(project: dict[str, Any], assets: list[dict[str, Any]], semaphore: asyncio.Semaphore) -> str:
+    header = f"PROJECT: {project['project_name']} ({project['year']})"
+    max_chars = CHUNK_TOKENS * CHARS_PER_TOKEN
+
+    items = [_format_asset(a) for a in assets]
+    label = f"ASSETS ({len(assets)})"
+    # Map, then reduce the notes until they fit into one call
+    while sum(len(item) + 1 for item in items) > max_chars:
+        chunks = _chunk(items, max_chars)
+        items = await asyncio.gather(*(
+            _run(chunk_agent, f"{header}\n{label}, part {i} of {len(chunks)}:\n" + "\n".join(chunk), semaphore)
+            for i, chunk in enumerate(chunks, 1)
+        ))
+        label = f"NOTES ON {len(chunks)} PARTS OF THE ASSETS ({len(assets)} assets in total)"
+
+    return await _run(summary_agent, f"{header}\n{label}:\n" + "\n".join(items), semaphore)
+
+
+async def _summarize_project(db: Database, project: dict[str, Any], semaphore: asyncio.Semaphore) -> None:
+    assets = await db.execute(PROJECT_ASSETS_SQL, (DOCUMENT_CHARS, project["id"]))
+    summary = await _summarize_assets(project, assets, semaphore)
+    await db.execute_write(
+        UPSERT_SUMMARY_SQL,
+        (project["id"], project["content_hash"], summary, _settings.openai_model),
+    )
+
+
+async def generate_project_summaries(db: Database | None = None, concurrency: int | None = None) -> dict[str, int]:
+    """Regenerate summaries for projects whose content hash changed."""
+    db = db or Database()
+    logger = get_logger()
+
+    projects = await db.execute(PROJECT_HASHES_SQL)
+    stale = [p for p in projects if p["stored_hash"] != p["content_hash"]]
+    logger.info(f"Project summaries: {len(stale)} stale of {len(projects)} projects")
+
+    semaphore = asyncio.Semaphore(concurrency or _settings.summary_concurrency)
+    results = await asyncio.gather(
+        *(_summarize_project(db, p, semaphore) for p in stale),
+        return_exceptions=True,
+    )
+
+    failed = 0
+    for project, result in zip(stale, results):
+        if isinstance(result, Exception):
+            failed += 1
+            logger.error(f"Summary failed for {project['project_name']}: {result}")
+
+    return {
+        "total": len(projects),
+        "generated": len(stale) - failed,
+        "failed": failed,
+        "unchanged": len(projects) - len(stale),
+    }
+
+
+if __name__ == "__main__":
+    print(asyncio.run(generate_project_summaries()))
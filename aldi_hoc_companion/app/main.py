@@ -1,15 +1,42 @@
+import asyncio
+from collections.abc import Awaitable
+from contextlib import asynccontextmanager
 from pathlib import Path
+from time import perf_counter
+from typing import TypeVar
+from uuid import uuid4
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.responses import FileResponse
 
 from aldi_hoc_companion.agent import ask
-from aldi_hoc_companion.models import ChatRequest, ChatResponse, TokenUsageResponse
+from aldi_hoc_companion.agent.resilience import ModelUnavailableError
+from aldi_hoc_companion.db import Database
+from aldi_hoc_companion.models import (
+    AgentResponse,
+    ChatRequest,
+    ChatResponse,
+    DBStats,
+    RequestStats,
+    ResponseStats,
+    TokenStats,
+    TokenUsageResponse,
+)
 from aldi_hoc_companion.core.config import get_settings
+from aldi_hoc_companion.core.logging import LogEntry, get_logger
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings = get_settings()
+    if settings.db_cache_enabled and settings.db_cache_notify_channel:
+        Database().start_invalidation_listener()
+    yield
+
 
-app = FastAPI(title="Aldi HoC Companion")
+app = FastAPI(title="Aldi HoC Companion", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,10 +46,67 @@ app.add_middleware(
 )
 
 
+# How often /chat checks whether the client is still connected
+DISCONNECT_POLL_SECONDS = 0.5
+
+T = TypeVar("T")
+
+
+async def run_until_disconnect(request: Request, work: Awaitable[T]) -> T:
+    """
+    Await work, cancelling it as soon as the HTTP client disconnects.
+
+    Cancellation propagates into agent.run (aborting the LLM call) and into
+    Database queries (cancelled server-side), so abandoned requests stop costing.
+    """
+    task = asyncio.ensure_future(work)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                task.cancel()
+                raise HTTPException(status_code=499, detail="Client closed request")
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+
+
+def _log_request(question: str, response: AgentResponse, duration_ms: float) -> None:
+    usage = response.usage
+    get_logger().log_request(LogEntry(
+        request=RequestStats(question=question, model=usage.model),
+        response=ResponseStats(
+            answer=response.result.answer,
+            sql_used=response.result.sql_used,
+            row_count=response.result.row_count,
+            duration_ms=round(duration_ms, 1),
+        ),
+        tokens=TokenStats(
+            input_tokens=usage.input_tokens,
+            output_tokens=usage.output_tokens,
+            total_tokens=usage.total_tokens,
+            input_cost_usd=usage.input_cost_usd,
+            output_cost_usd=usage.output_cost_usd,
+            total_cost_usd=usage.total_cost_usd,
+            retries=usage.retries,
+            hedges=usage.hedges,
+            hedge_wins=usage.hedge_wins,
+            failovers=usage.failovers,
+            extra_cost_usd=usage.extra_cost_usd,
+        ),
+        db=response.db_stats or DBStats(),
+    ))
+
+
 @app.post("/chat", response_model=ChatResponse)
-async def chat(body: ChatRequest):
+async def chat(body: ChatRequest, request: Request):
     try:
-        response = await ask(body.question)
+        session_id = body.session_id or uuid4().hex
+        start = perf_counter()
+        response = await run_until_disconnect(request, ask(body.question, session_id=session_id))
+        _log_request(body.question, response, (perf_counter() - start) * 1000)
         return ChatResponse(
             answer=response.result.answer,
             sql_used=response.result.sql_used,
@@ -35,8 +119,21 @@ async def chat(body: ChatRequest):
                 output_cost_usd=response.usage.output_cost_usd,
                 total_cost_usd=response.usage.total_cost_usd,
                 model=response.usage.model,
+                retries=response.usage.retries,
+                hedges=response.usage.hedges,
+                hedge_wins=response.usage.hedge_wins,
+                failovers=response.usage.failovers,
+                extra_cost_usd=response.usage.extra_cost_usd,
             ),
+            session_id=response.session_id,
         )
+    except HTTPException:
+        raise
+    except ModelUnavailableError as e:
+        raise HTTPException(status_code=504 if e.timed_out else 503, detail=str(e))
+    except TimeoutError as e:
+        # A database query or context stage ran past its deadline
+        raise HTTPException(status_code=504, detail=str(e) or "Request timed out")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
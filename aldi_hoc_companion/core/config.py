@@ -28,6 +28,11 @@ ALLOWED_MODELS = Literal[
     "gpt-3.5-turbo"
 ]
 
+# Agent context strategies (see agent/qa_agent.py)
+ContextMode = Literal["full", "summary", "hierarchical"]
+# Base system prompts: "inline" (qa_agent.SYSTEM_PROMPT) or "analyst" (prompts.SYSTEM_PROMPT)
+PromptVariant = Literal["inline", "analyst"]
+
 
 class Settings(BaseSettings):
     """
@@ -53,6 +58,16 @@ class Settings(BaseSettings):
     db_name: str = Field(default="aldi_hoc_companion")
     db_user: str = Field()
     db_password: str = Field()
+    db_schema: str | None = Field(default=None, description="Only schema on the search_path (default: server default)")
+    db_stream_itersize: int = Field(default=2000, description="Rows per batch for Database.execute_stream")
+    db_max_workers: int = Field(default=8, description="Threads in the dedicated DB executor")
+    db_query_timeout_seconds: float = Field(default=30.0, description="Default per-query statement_timeout")
+    db_cache_enabled: bool = Field(default=False, description="Cache read-only query results in memory")
+    db_cache_max_entries: int = Field(default=256)
+    db_cache_ttl_seconds: float = Field(default=300.0)
+    db_cache_notify_channel: str | None = Field(
+        default="query_cache", description="LISTEN channel for cache invalidations from other processes"
+    )
 
     # -----------------------
     # OpenAI Model Configuration
@@ -61,6 +76,54 @@ class Settings(BaseSettings):
     openai_model: str = Field(default="gpt-4o-mini", description="Model to use: gpt-4o or gpt-4o-mini")
     openai_base_url: str | None = Field(default=None)
 
+    # -----------------------
+    # Model Resilience (agent/resilience.py)
+    # -----------------------
+    llm_timeout_seconds: float = Field(default=60.0, description="Timeout per model request attempt")
+    llm_max_retries: int = Field(default=2, description="Retries of a model request on transient errors")
+    llm_retry_base_delay_seconds: float = Field(default=0.5)
+    llm_retry_max_delay_seconds: float = Field(default=8.0)
+    llm_fallback_model: str | None = Field(
+        default=None, description="Model for hedged requests and failover (none: no hedging)"
+    )
+    llm_hedge_percentile: float = Field(default=95.0, description="Primary latency percentile that starts the hedge")
+    llm_hedge_min_samples: int = Field(default=20, description="Latencies needed before the percentile is used")
+    llm_hedge_initial_delay_seconds: float = Field(default=10.0, description="Hedge deadline until then")
+
+    # -----------------------
+    # Agent Context
+    # -----------------------
+    context_mode: ContextMode = Field(
+        default="full",
+        description=(
+            "full: every asset row in the prompt; summary: precomputed rollups only; "
+            "hierarchical: project summaries, then drill into selected projects"
+        ),
+    )
+    context_stage_timeout_seconds: float = Field(
+        default=10.0, description="Timeout per context pipeline stage before falling back"
+    )
+    system_prompt_variant: PromptVariant = Field(default="inline")
+    summary_concurrency: int = Field(default=4, description="Parallel LLM calls for the project summary job")
+
+    # -----------------------
+    # Evals (aldi_hoc_companion/evals)
+    # -----------------------
+    eval_db_name: str | None = Field(default=None, description="Scratch database for the eval fixture catalogue")
+    eval_db_schema: str = Field(default="eval_fixture", description="Schema the fixture catalogue is created in")
+
+    # -----------------------
+    # Chat Sessions
+    # -----------------------
+    session_backend: Literal["memory", "sqlite"] = Field(default="memory")
+    session_sqlite_path: Path = Field(default=PROJECT_ROOT / "sessions.sqlite3")
+    session_max_sessions: int = Field(default=1000, description="Least recently used sessions beyond this are dropped")
+    session_max_bytes: int = Field(
+        default=64 * 1024 * 1024,
+        description="Total size of stored histories (system prompts included) beyond which least recently used sessions are dropped",
+    )
+    session_token_budget: int = Field(default=4000, description="Conversation tokens kept before older turns are compacted")
+
     # -----------------------
     # Logging
     # -----------------------
@@ -86,6 +149,13 @@ class Settings(BaseSettings):
             raise ValueError(f"openai_model must be one of {allowed}")
         return v
 
+    @field_validator("llm_fallback_model")
+    @classmethod
+    def validate_llm_fallback_model(cls, v: str | None):
+        if v is not None and v not in MODEL_PRICING:
+            raise ValueError(f"llm_fallback_model must be one of {set(MODEL_PRICING.keys())}")
+        return v
+
     # -----------------------
     # Computed Properties
     # -----------------------
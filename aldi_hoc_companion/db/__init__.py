@@ -1,3 +1,3 @@
-from aldi_hoc_companion.db.db import Database, Project
+from aldi_hoc_companion.db.db import Database, Project, RowBatch
 
-__all__ = ["Database", "Project"]
+__all__ = ["Database", "Project", "RowBatch"]
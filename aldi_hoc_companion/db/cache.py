@@ -0,0 +1,131 @@
+"""
+Process-wide cache for read-only query results.
+
+Entries are keyed on whitespace-normalised SQL plus params, bounded in size
+(LRU) and in age (TTL). Every entry remembers the version of each table it
+read; bumping a table's version (after a write, or on a NOTIFY from another
+process) makes all entries that read it stale.
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any
+
+from aldi_hoc_companion.core.config import get_settings
+
+# Tables/views a query reads from
+_READ_TABLES_RE = re.compile(r"\b(?:from|join)\s+([a-z_][\w.]*)", re.IGNORECASE)
+# Tables a DML statement writes to
+_WRITE_TABLES_RE = re.compile(
+    r"\b(?:insert\s+into|update|delete\s+from|refresh\s+materialized\s+view(?:\s+concurrently)?)\s+([a-z_][\w.]*)",
+    re.IGNORECASE,
+)
+# Statements that may change data or schema in ways we don't track per table
+_DDL_RE = re.compile(r"\b(?:create|drop|alter|truncate)\b", re.IGNORECASE)
+# Anything that makes a SELECT unsafe or pointless to cache
+_UNCACHEABLE_RE = re.compile(
+    r"\b(?:insert|update|delete|merge|create|drop|alter|truncate|refresh|for\s+update|random|now|nextval|setval|pg_\w+)\b",
+    re.IGNORECASE,
+)
+# Pseudo-table read by every query; bumped by clear()
+_ALL_TABLES = "*"
+
+
+def normalize_sql(sql: str) -> str:
+    return " ".join(sql.split())
+
+
+def read_tables(sql: str) -> frozenset[str]:
+    return frozenset(name.lower() for name in _READ_TABLES_RE.findall(sql)) | {_ALL_TABLES}
+
+
+def is_cacheable(sql: str) -> bool:
+    """Only plain SELECT/WITH reads without volatile functions are cached."""
+    head = sql.lstrip().split(None, 1)[0].lower() if sql.strip() else ""
+    return head in ("select", "with") and not _UNCACHEABLE_RE.search(sql)
+
+
+@dataclass
+class _Entry:
+    rows: list[dict[str, Any]]
+    versions: dict[str, int]
+    expires_at: float
+
+
+class QueryCache:
+
+    def __init__(self, max_entries: int = 256, ttl_seconds: float = 300.0):
+        self._max_entries = max_entries
+        self._ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[tuple[str, str], _Entry] = OrderedDict()
+        self._versions: dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(sql: str, params: tuple) -> tuple[str, str]:
+        # repr() keeps list params (e.g. ANY(%s)) hashable
+        return normalize_sql(sql), repr(params)
+
+    def snapshot(self, sql: str) -> dict[str, int]:
+        """Current versions of the tables sql reads; take it BEFORE running the query."""
+        with self._lock:
+            return {table: self._versions.get(table, 0) for table in read_tables(sql)}
+
+    def get(self, sql: str, params: tuple = ()) -> list[dict[str, Any]] | None:
+        key = self._key(sql, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            fresh = (
+                entry is not None
+                and entry.expires_at > time.monotonic()
+                and all(self._versions.get(t, 0) == v for t, v in entry.versions.items())
+            )
+            if not fresh:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            # Callers get their own list; the row dicts are shared and must not be mutated
+            return list(entry.rows)
+
+    def put(self, sql: str, params: tuple, rows: list[dict[str, Any]], versions: dict[str, int]) -> None:
+        key = self._key(sql, params)
+        with self._lock:
+            self._entries[key] = _Entry(rows=rows, versions=versions, expires_at=time.monotonic() + self._ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+
+    def bump(self, *tables: str) -> None:
+        """Invalidate every cached result that read any of these tables."""
+        with self._lock:
+            for table in tables:
+                table = table.strip().lower()
+                if table:
+                    self._versions[table] = self._versions.get(table, 0) + 1
+
+    def bump_for_statement(self, sql: str) -> None:
+        """Invalidate after a write: per target table for DML, everything for DDL/TRUNCATE."""
+        if _DDL_RE.search(sql):
+            self.clear()
+            return
+        self.bump(*_WRITE_TABLES_RE.findall(sql))
+
+    def clear(self) -> None:
+        """Invalidate everything, including results of queries still in flight."""
+        with self._lock:
+            self._entries.clear()
+            self._versions[_ALL_TABLES] = self._versions.get(_ALL_TABLES, 0) + 1
+
+
+@lru_cache()
+def get_query_cache() -> QueryCache:
+    settings = get_settings()
+    return QueryCache(settings.db_cache_max_entries, settings.db_cache_ttl_seconds)
@@ -1,12 +1,33 @@
 import asyncio
+import select
+import threading
+import time
+from collections.abc import AsyncIterator
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from functools import partial
-from typing import Any
+from functools import lru_cache, partial
+from typing import TYPE_CHECKING, Any
+from uuid import uuid4
 
 import psycopg2
+import psycopg2.extensions
+from psycopg2 import sql as pgsql
 from psycopg2.extras import RealDictCursor
 
 from aldi_hoc_companion.core.config import get_settings
+from aldi_hoc_companion.db.cache import get_query_cache, is_cacheable
+
+if TYPE_CHECKING:
+    from aldi_hoc_companion.models.logging_models import DBStats
+
+# Materialized views defined in sql/scripts/rollups.sql
+ROLLUP_VIEWS = (
+    "rollup_year", "rollup_project", "rollup_kind_language", "rollup_project_facets", "rollup_project_keywords"
+)
+# Refreshing a view is a batch job - allow it far more time than an interactive query
+ROLLUP_REFRESH_TIMEOUT_SECONDS = 600.0
+# Reconnect delay for the cache invalidation listener
+LISTEN_RETRY_SECONDS = 5.0
 
 
 @dataclass
@@ -16,12 +37,74 @@ class Project:
     year: int
 
 
+@dataclass
+class RowBatch:
+    """A batch of streamed rows: column names once, values as tuples."""
+    columns: tuple[str, ...]
+    rows: list[tuple]
+
+    def as_dicts(self) -> list[dict[str, Any]]:
+        return [dict(zip(self.columns, row)) for row in self.rows]
+
+    def as_columns(self) -> dict[str, tuple]:
+        """Columnar view: column name -> tuple of values."""
+        if not self.rows:
+            return {column: () for column in self.columns}
+        return dict(zip(self.columns, zip(*self.rows)))
+
+
+class _QueryHandle:
+    """
+    Link between an awaiting task and the connection used in an executor thread,
+    so the task can cancel the query server-side when it times out or is cancelled.
+    """
+
+    def __init__(self):
+        self._conn = None
+        self._cancelled = False
+        self._lock = threading.Lock()
+
+    def attach(self, conn) -> None:
+        with self._lock:
+            if self._cancelled:
+                raise psycopg2.extensions.QueryCanceledError("query cancelled before it started")
+            self._conn = conn
+
+    def detach(self) -> None:
+        with self._lock:
+            self._conn = None
+
+    def cancel(self) -> None:
+        with self._lock:
+            self._cancelled = True
+            if self._conn is not None:
+                try:
+                    self._conn.cancel()
+                except psycopg2.Error:
+                    pass
+
+
+@lru_cache()
+def get_db_executor() -> ThreadPoolExecutor:
+    """Dedicated, bounded thread pool for blocking database calls."""
+    return ThreadPoolExecutor(max_workers=get_settings().db_max_workers, thread_name_prefix="db")
+
+
 class Database:
 
     def __init__(self):
         self._settings = get_settings()
+        self.query_count = 0
+        self.total_query_time_ms = 0.0
+        self.last_query_time_ms = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
 
     def _get_conn(self):
+        timeout_ms = int(self._settings.db_query_timeout_seconds * 1000)
+        options = f"-c statement_timeout={timeout_ms}"
+        if self._settings.db_schema:
+            options += f" -c search_path={self._settings.db_schema}"
         return psycopg2.connect(
             host=self._settings.db_host,
             port=self._settings.db_port,
@@ -29,22 +112,215 @@ class Database:
             user=self._settings.db_user,
             password=self._settings.db_password,
             cursor_factory=RealDictCursor,
+            options=options,
         )
 
-    def _execute_sync(self, sql: str, params: tuple = ()) -> list[dict[str, Any]]:
+    def _execute_sync(
+        self,
+        sql: str,
+        params: tuple = (),
+        timeout: float | None = None,
+        handle: _QueryHandle | None = None,
+        commit: bool = False,
+    ) -> list[dict[str, Any]]:
         """Execute SQL synchronously."""
         conn = self._get_conn()
         try:
+            if handle:
+                handle.attach(conn)
             with conn.cursor() as cur:
+                if timeout is not None:
+                    cur.execute("SET LOCAL statement_timeout = %s", (int(timeout * 1000),))
                 cur.execute(sql, params)
-                return [dict(row) for row in cur.fetchall()]
+                if commit:
+                    conn.commit()
+                    return []
+                # RealDictRow is already a dict - no per-row copy
+                return cur.fetchall()
         finally:
+            if handle:
+                handle.detach()
             conn.close()
 
-    async def execute(self, sql: str, params: tuple = ()) -> list[dict[str, Any]]:
-        """Execute SQL asynchronously (runs sync code in executor)."""
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, partial(self._execute_sync, sql, params))
+    async def _run_cancellable(self, sql: str, params: tuple, timeout: float | None, commit: bool = False):
+        """
+        Run a query on the DB executor. If it exceeds its timeout or the awaiting
+        task is cancelled (e.g. the client disconnected), the query is cancelled
+        on the server instead of running to completion.
+        """
+        loop = asyncio.get_running_loop()
+        handle = _QueryHandle()
+        future = loop.run_in_executor(
+            get_db_executor(),
+            partial(self._execute_sync, sql, params, timeout, handle, commit),
+        )
+        try:
+            return await asyncio.wait_for(future, timeout or self._settings.db_query_timeout_seconds)
+        except (asyncio.CancelledError, TimeoutError):
+            handle.cancel()
+            raise
+
+    async def execute(
+        self, sql: str, params: tuple = (), timeout: float | None = None, cache: bool = True
+    ) -> list[dict[str, Any]]:
+        """
+        Execute SQL asynchronously on the DB executor.
+
+        timeout (seconds) overrides DB_QUERY_TIMEOUT_SECONDS for this query,
+        both as server statement_timeout and as client-side deadline.
+        Read-only queries are served from the query cache when DB_CACHE_ENABLED
+        (pass cache=False to bypass it). Cached rows are shared - don't mutate them.
+        """
+        query_cache = get_query_cache() if cache and self._settings.db_cache_enabled and is_cacheable(sql) else None
+        if query_cache:
+            rows = query_cache.get(sql, params)
+            if rows is not None:
+                self.cache_hits += 1
+                return rows
+            self.cache_misses += 1
+            versions = query_cache.snapshot(sql)
+
+        start = time.perf_counter()
+        rows = await self._run_cancellable(sql, params, timeout)
+        self._record_query_time(start)
+
+        if query_cache:
+            query_cache.put(sql, params, rows, versions)
+        return rows
+
+    def _record_query_time(self, start: float) -> None:
+        self.last_query_time_ms = (time.perf_counter() - start) * 1000
+        self.total_query_time_ms += self.last_query_time_ms
+        self.query_count += 1
+
+    def get_db_stats(self) -> "DBStats":
+        """Query and cache statistics of this Database instance."""
+        # Imported here: models imports the db package
+        from aldi_hoc_companion.models.logging_models import DBStats
+
+        return DBStats(
+            connected=self.query_count > 0,
+            query_count=self.query_count,
+            total_query_time_ms=round(self.total_query_time_ms, 1),
+            last_query_time_ms=round(self.last_query_time_ms, 1),
+            cache_hits=self.cache_hits,
+            cache_misses=self.cache_misses,
+        )
+
+    async def execute_stream(
+        self, sql: str, params: tuple = (), batch_size: int | None = None
+    ) -> AsyncIterator[RowBatch]:
+        """
+        Stream a large result in batches through a named server-side cursor.
+
+        Only one batch is held in memory at a time, as plain tuples.
+        batch_size defaults to DB_STREAM_ITERSIZE. Cancelling the consuming
+        task cancels the query on the server.
+        """
+        batch_size = batch_size or self._settings.db_stream_itersize
+        loop = asyncio.get_running_loop()
+        executor = get_db_executor()
+        handle = _QueryHandle()
+        conn = await loop.run_in_executor(executor, self._get_conn)
+        handle.attach(conn)
+        try:
+            cur = conn.cursor(name=f"stream_{uuid4().hex}", cursor_factory=psycopg2.extensions.cursor)
+            cur.itersize = batch_size
+            await loop.run_in_executor(executor, partial(cur.execute, sql, params))
+            columns: tuple[str, ...] = ()
+            while True:
+                rows = await loop.run_in_executor(executor, partial(cur.fetchmany, batch_size))
+                if not rows:
+                    break
+                # Named cursors only expose the description after the first fetch
+                columns = columns or tuple(column.name for column in cur.description)
+                yield RowBatch(columns=columns, rows=rows)
+        except asyncio.CancelledError:
+            handle.cancel()
+            raise
+        finally:
+            handle.detach()
+            await loop.run_in_executor(executor, conn.close)
+
+    async def execute_write(self, sql: str, params: tuple = (), timeout: float | None = None) -> None:
+        """Execute a write statement on the DB executor, commit it and invalidate cached reads."""
+        start = time.perf_counter()
+        try:
+            await self._run_cancellable(sql, params, timeout, commit=True)
+        finally:
+            get_query_cache().bump_for_statement(sql)
+        self._record_query_time(start)
+
+    async def refresh_rollups(self) -> None:
+        """Refresh all rollup views concurrently. Call after ingestion (see db/rollups.py)."""
+        await asyncio.gather(*(
+            self.execute_write(
+                f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view}", timeout=ROLLUP_REFRESH_TIMEOUT_SECONDS
+            )
+            for view in ROLLUP_VIEWS
+        ))
+        # Let the query caches of other processes know
+        if self._settings.db_cache_notify_channel:
+            await self.execute_write(
+                "SELECT pg_notify(%s, %s)", (self._settings.db_cache_notify_channel, ",".join(ROLLUP_VIEWS))
+            )
+
+    def _listen_sync(self, channel: str) -> None:
+        """Bump query cache versions for every NOTIFY on channel (payload: comma-separated tables)."""
+        # Imported here: core.logging imports models, which imports the db package
+        from aldi_hoc_companion.core.logging import get_logger
+
+        query_cache = get_query_cache()
+        while True:
+            conn = None
+            try:
+                conn = self._get_conn()
+                conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cur:
+                    cur.execute(pgsql.SQL("LISTEN {}").format(pgsql.Identifier(channel)))
+                while True:
+                    if select.select([conn], [], [], LISTEN_RETRY_SECONDS) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        if notify.payload:
+                            query_cache.bump(*notify.payload.split(","))
+                        else:
+                            query_cache.clear()
+            except Exception as e:
+                # Any error (not just psycopg2's - select can raise OSError/ValueError) must not
+                # end the thread. Notifications may have been missed while disconnected
+                get_logger().warning(
+                    f"Cache invalidation listener failed ({type(e).__name__}: {e}) - "
+                    f"reconnecting in {LISTEN_RETRY_SECONDS:.0f}s"
+                )
+                query_cache.clear()
+                time.sleep(LISTEN_RETRY_SECONDS)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+    def start_invalidation_listener(self) -> threading.Thread:
+        """Listen for cache invalidations from other processes in a daemon thread."""
+        thread = threading.Thread(
+            target=self._listen_sync,
+            args=(self._settings.db_cache_notify_channel,),
+            name="db-cache-listener",
+            daemon=True,
+        )
+        thread.start()
+        return thread
+
+    async def has_column(self, table: str, column: str) -> bool:
+        """Whether a table in the current schema has a column - for optional migrations such as asset_clusters.sql."""
+        rows = await self.execute("""
+            SELECT EXISTS (
+                SELECT 1 FROM information_schema.columns
+                WHERE table_schema = current_schema() AND table_name = %s AND column_name = %s
+            ) AS present
+        """, (table, column))
+        return rows[0]["present"]
 
     async def get_schema(self) -> str:
         """Return database schema description for LLM."""
@@ -105,9 +381,23 @@ STRATEGY:
 4. Always JOIN tables when you need both project and asset information
 """.strip()
 
-    async def get_stats(self) -> dict[str, Any]:
-        """Get quick database statistics."""
+    async def get_stats(self, summary: bool = False) -> dict[str, Any]:
+        """Get quick database statistics.
+
+        With summary=True the numbers come from the rollup_year view only.
+        """
         stats = {}
+
+        if summary:
+            years = await self.execute(
+                "SELECT year, project_count, asset_count FROM rollup_year ORDER BY year DESC"
+            )
+            stats["total_projects"] = sum(y["project_count"] for y in years)
+            stats["total_assets"] = sum(y["asset_count"] for y in years)
+            stats["projects_by_year"] = [
+                {"year": y["year"], "count": y["project_count"]} for y in years[:5]
+            ]
+            return stats
         
         result = await self.execute("SELECT COUNT(*) as count FROM projects")
         stats["total_projects"] = result[0]["count"] if result else 0
@@ -0,0 +1,116 @@
+"""
+Near-duplicate clustering of assets (versions and language variants).
+
+The same banner usually exists as several versions and in Dutch/French/
+Multilingual variants whose asset_content differs by a few words. Assets
+of one project with the same kind and file-name stem are compared by a
+64-bit SimHash over their content; assets within MAX_HAMMING_DISTANCE bits
+share a cluster. assets.cluster_id is the lowest asset id in the cluster,
+so it is stable across runs. Run after ingestion (after asset_clusters.sql):
+
+    python -m aldi_hoc_companion.db.dedup
+"""
+import asyncio
+import re
+import unicodedata
+from collections import defaultdict
+from hashlib import blake2b
+from pathlib import PurePath
+from typing import Any
+
+from aldi_hoc_companion.core.logging import get_logger
+from aldi_hoc_companion.db.db import Database
+
+SIMHASH_BITS = 64
+# Descriptions that differ only in the quoted slogan measure 2-11 bits apart, but
+# unrelated short descriptions can be as close as 15-18 (strawberries vs asparagus
+# banner), so the margin is thin: candidates are first gated by project, kind and stem
+MAX_HAMMING_DISTANCE = 12
+
+_TOKEN_RE = re.compile(r"\w+")
+# File-name parts that mark a variant rather than a different asset: language codes and
+# explicit version markers only - banner_1/banner_2 or folder_week_12/13 are different assets
+_VARIANT_PART_RE = re.compile(r"^(?:nl|fr|en|de|be|vl|ml|multi|v\d+|version\d*)$")
+
+ASSETS_SQL = "SELECT id, project_id, asset_kind, file_name, asset_content, cluster_id FROM assets ORDER BY id"
+
+UPDATE_CLUSTERS_SQL = """
+    UPDATE assets a
+    SET cluster_id = c.cluster_id
+    FROM unnest(%s::integer[], %s::integer[]) AS c(id, cluster_id)
+    WHERE a.id = c.id
+"""
+
+
+def _normalize(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def simhash(text: str | None) -> int:
+    """64-bit SimHash over the word tokens of text (case and accents ignored)."""
+    weights = [0] * SIMHASH_BITS
+    for token in _TOKEN_RE.findall(_normalize(text or "")):
+        h = int.from_bytes(blake2b(token.encode(), digest_size=SIMHASH_BITS // 8).digest(), "big")
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if h >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def file_stem(file_name: str | None) -> str:
+    """File name without extension, language codes and version markers: kerst_banner_NL_v2.psd -> kerst_banner."""
+    parts = re.split(r"[\W_]+", _normalize(PurePath(file_name or "").stem))
+    return "_".join(p for p in parts if p and not _VARIANT_PART_RE.match(p))
+
+
+def cluster_assets(assets: list[dict[str, Any]], max_distance: int = MAX_HAMMING_DISTANCE) -> dict[int, int]:
+    """
+    Map asset id -> cluster id for assets with keys id, project_id,
+    asset_kind, file_name and asset_content.
+    """
+    groups: dict[tuple, list[tuple[int, int]]] = defaultdict(list)
+    for a in assets:
+        key = (a["project_id"], (a["asset_kind"] or "").lower(), file_stem(a["file_name"]))
+        groups[key].append((a["id"], simhash(a["asset_content"])))
+
+    parent = {a["id"]: a["id"] for a in assets}
+
+    def find(asset_id: int) -> int:
+        while parent[asset_id] != asset_id:
+            parent[asset_id] = parent[parent[asset_id]]
+            asset_id = parent[asset_id]
+        return asset_id
+
+    # Groups are a handful of variants, so pairwise comparison is cheap
+    for members in groups.values():
+        for i, (id_a, hash_a) in enumerate(members):
+            for id_b, hash_b in members[i + 1:]:
+                if hamming_distance(hash_a, hash_b) <= max_distance:
+                    root_a, root_b = find(id_a), find(id_b)
+                    parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    return {asset_id: find(asset_id) for asset_id in parent}
+
+
+async def assign_clusters(db: Database | None = None) -> dict[str, int]:
+    """Recompute assets.cluster_id and write the ids that changed."""
+    db = db or Database()
+    assets = [row async for batch in db.execute_stream(ASSETS_SQL) for row in batch.as_dicts()]
+    clusters = cluster_assets(assets)
+
+    changed = [(a["id"], clusters[a["id"]]) for a in assets if a["cluster_id"] != clusters[a["id"]]]
+    if changed:
+        ids, cluster_ids = zip(*changed)
+        await db.execute_write(UPDATE_CLUSTERS_SQL, (list(ids), list(cluster_ids)))
+
+    stats = {"assets": len(assets), "clusters": len(set(clusters.values())), "updated": len(changed)}
+    get_logger().info(f"Asset clusters: {stats}")
+    return stats
+
+
+if __name__ == "__main__":
+    print(asyncio.run(assign_clusters()))
@@ -0,0 +1,28 @@
+"""
+Refresh of the rollup materialized views (sql/scripts/rollups.sql).
+
+The views keep the data they were last refreshed with, so summary-mode
+counts are only as fresh as the last run. Run after ingestion (after the
+dedup job, before the summaries):
+
+    python -m aldi_hoc_companion.db.rollups
+"""
+import asyncio
+import time
+
+from aldi_hoc_companion.core.logging import get_logger
+from aldi_hoc_companion.db.db import ROLLUP_VIEWS, Database
+
+
+async def refresh_rollups(db: Database | None = None) -> dict[str, object]:
+    """Refresh every rollup view concurrently (readers are not blocked)."""
+    db = db or Database()
+    start = time.perf_counter()
+    await db.refresh_rollups()
+    stats = {"views": list(ROLLUP_VIEWS), "seconds": round(time.perf_counter() - start, 1)}
+    get_logger().info(f"Rollups refreshed: {stats}")
+    return stats
+
+
+if __name__ == "__main__":
+    print(asyncio.run(refresh_rollups()))
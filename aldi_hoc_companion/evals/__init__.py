@@ -0,0 +1,4 @@
+from .harness import EvalConfig, GoldenQuestion, run_eval
+from .recorder import Cassette
+
+__all__ = ["Cassette", "EvalConfig", "GoldenQuestion", "run_eval"]
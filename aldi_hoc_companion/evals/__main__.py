@@ -0,0 +1,63 @@
+"""
+Evaluate agent configurations against the golden question set.
+
+    # once, into the eval schema of a scratch database (or set EVAL_DB_NAME):
+    python -m aldi_hoc_companion.evals --db-name aldi_eval --seed --mode record    # needs OPENAI_API_KEY
+
+    # afterwards, offline and deterministic:
+    python -m aldi_hoc_companion.evals --db-name aldi_eval --config full:inline:gpt-4o-mini
+"""
+import argparse
+import asyncio
+import json
+from pathlib import Path
+
+from aldi_hoc_companion.core.config import get_settings
+from aldi_hoc_companion.evals.harness import (
+    EvalConfig,
+    format_report,
+    run_eval,
+    seed_fixture_catalogue,
+    use_eval_database,
+)
+
+
+def main() -> None:
+    model = get_settings().openai_model
+    parser = argparse.ArgumentParser(prog="python -m aldi_hoc_companion.evals")
+    parser.add_argument("--mode", choices=["replay", "record"], default="replay")
+    parser.add_argument(
+        "--config",
+        action="append",
+        type=EvalConfig.parse,
+        help="context_mode:prompt:model (repeatable)",
+    )
+    parser.add_argument("--db-name", help="Scratch database with the fixture catalogue (default: EVAL_DB_NAME)")
+    parser.add_argument("--seed", action="store_true", help="(Re)seed the fixture catalogue first")
+    parser.add_argument("--output", type=Path, help="Write the full report as JSON")
+    args = parser.parse_args()
+    try:
+        use_eval_database(args.db_name)
+    except ValueError as e:
+        parser.error(str(e))
+
+    configs = args.config or [
+        EvalConfig("full", "inline", model),
+        EvalConfig("summary", "inline", model),
+        EvalConfig("hierarchical", "inline", model),
+        EvalConfig("full", "analyst", model),
+    ]
+
+    async def run():
+        if args.seed:
+            await seed_fixture_catalogue()
+        return await run_eval(configs, mode=args.mode)
+
+    reports = asyncio.run(run())
+    print(format_report(reports))
+    if args.output:
+        args.output.write_text(json.dumps([r.to_dict() for r in reports], ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
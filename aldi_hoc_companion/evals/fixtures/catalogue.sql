@@ -0,0 +1,64 @@
+-- =====================================================
+-- Fixture catalogue for the eval harness, created in its
+-- own schema (EVAL_DB_SCHEMA) of a scratch database
+-- (EVAL_DB_NAME); the schema's tables are truncated.
+-- Seed with:
+--   python -m aldi_hoc_companion.evals --db-name <scratch db> --seed
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS projects (
+    id SERIAL PRIMARY KEY,
+    project_id TEXT UNIQUE NOT NULL,
+    project_name TEXT NOT NULL,
+    year INTEGER NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS assets (
+    id SERIAL PRIMARY KEY,
+    project_id INTEGER NOT NULL REFERENCES projects(id),
+    file_name TEXT,
+    file_path TEXT,
+    file_type TEXT,
+    file_size BIGINT,
+    description TEXT,
+    language TEXT,
+    version TEXT,
+    asset_kind TEXT,
+    asset_content TEXT,
+    document_content TEXT,
+    campaign_context TEXT
+);
+
+TRUNCATE assets, projects RESTART IDENTITY CASCADE;
+
+INSERT INTO projects (project_id, project_name, year) VALUES
+    ('2024_ALDI_Christmas', 'Kerstcampagne 2024', 2024),
+    ('2024_ALDI_BBQ', 'Zomer BBQ actie', 2024),
+    ('2025_ALDI_Quality', 'Kwaliteitscampagne', 2025),
+    ('2023_ALDI_Easter', 'Paascampagne 2023', 2023);
+
+INSERT INTO assets (project_id, file_name, file_type, language, version, asset_kind, asset_content, document_content, campaign_context) VALUES
+    (1, 'kerst_banner_NL_v1.psd', '.psd', 'Dutch', '1', 'banner',
+     'Festive dinner table with roast turkey, stollen and candles. Text: Zalig Kerstfeest.', NULL, 'execution'),
+    (1, 'kerst_banner_FR_v1.psd', '.psd', 'French', '1', 'banner',
+     'Festive dinner table with roast turkey, stollen and candles. Text: Joyeux Noel.', NULL, 'execution'),
+    (1, 'kerst_tv_spot.mp4', '.mp4', 'Multilingual', NULL, 'video',
+     'Family decorating a Christmas tree, then sharing a stollen and hot chocolate.', NULL, 'execution'),
+    (1, 'kerst_briefing.pdf', '.pdf', 'Dutch', NULL, 'document',
+     'Briefing document for the Christmas campaign.',
+     'Doel: premium kerstassortiment positioneren. Kernproducten: kalkoen, stollen, champagne.', 'briefing'),
+    (2, 'bbq_banner_NL_v2.jpg', '.jpg', 'Dutch', '2', 'banner',
+     'Grill with sausages, burgers and spare ribs in a sunny garden. Text: Vuur aan!', NULL, 'execution'),
+    (2, 'bbq_banner_FR_v2.jpg', '.jpg', 'French', '2', 'banner',
+     'Grill with sausages, burgers and spare ribs in a sunny garden. Text: Allumez le feu!', NULL, 'execution'),
+    (2, 'bbq_email.html', '.html', 'Dutch', NULL, 'email',
+     'Newsletter announcing BBQ meat packages with beef steak and chicken skewers.', NULL, 'execution'),
+    (3, 'kwaliteit_photo_groenten.jpg', '.jpg', 'None', NULL, 'photo',
+     'Close-up of fresh vegetables and fruit from Belgian farmers.', NULL, 'execution'),
+    (3, 'kwaliteit_briefing.pdf', '.pdf', 'Dutch', NULL, 'document',
+     'Briefing for the quality campaign.',
+     'Boodschap: versheid en lokale producenten. Kanalen: TV, online video, folder.', 'briefing'),
+    (3, 'kwaliteit_video_30s.mp4', '.mp4', 'Dutch', NULL, 'video',
+     'Farmer harvesting strawberries, cut to the strawberries on an ALDI shelf.', NULL, 'execution'),
+    (4, 'pasen_banner_NL.psd', '.psd', 'Dutch', NULL, 'banner',
+     'Chocolate Easter eggs and bunnies in a spring basket with daffodils.', NULL, 'execution');
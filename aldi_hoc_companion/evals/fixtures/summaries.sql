@@ -0,0 +1,9 @@
+-- Fixed project summaries for the fixture catalogue, so the hierarchical
+-- context mode can be evaluated without running the summary job.
+INSERT INTO project_summaries (project_id, content_hash, summary, model) VALUES
+    (1, 'fixture', 'Christmas 2024 campaign (Kerst): Dutch and French banners of a festive dinner with turkey (kalkoen) and stollen, a multilingual TV spot with a Christmas tree, and a Dutch briefing on the premium Christmas range.', 'fixture'),
+    (2, 'fixture', 'Summer BBQ 2024 promotion: Dutch and French banners of a grill with sausages, burgers and spare ribs, plus a Dutch email about meat packages (beef steak, chicken skewers).', 'fixture'),
+    (3, 'fixture', 'Quality campaign 2025 (Kwaliteit): freshness and local Belgian farmers; photo of vegetables and fruit, a Dutch video with strawberries and a Dutch briefing document.', 'fixture'),
+    (4, 'fixture', 'Easter 2023 campaign (Pasen): one Dutch banner with chocolate Easter eggs, bunnies and daffodils.', 'fixture')
+ON CONFLICT (project_id) DO UPDATE
+SET content_hash = EXCLUDED.content_hash, summary = EXCLUDED.summary, model = EXCLUDED.model, updated_at = now();
@@ -0,0 +1,251 @@
+"""
+Offline evaluation of context strategy / prompt / model configurations.
+
+Every configuration answers the golden questions over the seeded fixture
+catalogue and is scored on correctness, prompt tokens, cost and latency.
+Model responses come from record/replay cassettes (see recorder.py).
+"""
+import json
+import math
+import os
+import re
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from time import perf_counter
+from typing import Literal
+
+from aldi_hoc_companion.agent import ask
+from aldi_hoc_companion.agent.qa_agent import agent
+from aldi_hoc_companion.core.config import PROJECT_ROOT, ContextMode, PromptVariant, get_settings
+from aldi_hoc_companion.db import Database
+from aldi_hoc_companion.db.cache import get_query_cache
+from aldi_hoc_companion.db.dedup import assign_clusters
+from aldi_hoc_companion.evals.recorder import Cassette, RecordingModel, ReplayModel
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+CASSETTES_DIR = FIXTURES_DIR / "cassettes"
+SQL_SCRIPTS_DIR = PROJECT_ROOT / "sql" / "scripts"
+
+_SCHEMA_NAME_RE = re.compile(r"^[a-z_][a-z0-9_]*$")
+
+# Executed in order by seed_fixture_catalogue()
+SEED_SCRIPTS = (
+    FIXTURES_DIR / "catalogue.sql",
+    SQL_SCRIPTS_DIR / "asset_clusters.sql",
+    SQL_SCRIPTS_DIR / "rollups.sql",
+    SQL_SCRIPTS_DIR / "project_summaries.sql",
+    FIXTURES_DIR / "summaries.sql",
+)
+
+
+@dataclass
+class GoldenQuestion:
+    """A question with its expected answer: exact text and/or required keywords."""
+    question: str
+    keywords: list[str] = field(default_factory=list)  # "a|b" = any of the alternatives
+    exact: str | None = None
+
+
+@dataclass(frozen=True)
+class EvalConfig:
+    context_mode: ContextMode = "full"
+    prompt: PromptVariant = "inline"
+    model: str = "gpt-4o-mini"
+
+    @property
+    def name(self) -> str:
+        return f"{self.context_mode}-{self.prompt}-{self.model}"
+
+    @classmethod
+    def parse(cls, spec: str) -> "EvalConfig":
+        """Parse "context_mode:prompt:model", e.g. "summary:analyst:gpt-4.1-mini"."""
+        context_mode, prompt, model = spec.split(":")
+        return cls(context_mode=context_mode, prompt=prompt, model=model)
+
+
+@dataclass
+class QuestionResult:
+    question: str
+    answer: str = ""
+    passed: bool = False
+    score: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cost_usd: float = 0.0
+    latency_ms: float = 0.0
+    error: str | None = None
+
+
+@dataclass
+class ConfigReport:
+    config: EvalConfig
+    results: list[QuestionResult]
+
+    @property
+    def accuracy(self) -> float:
+        return sum(r.passed for r in self.results) / len(self.results) if self.results else 0.0
+
+    @property
+    def mean_score(self) -> float:
+        return sum(r.score for r in self.results) / len(self.results) if self.results else 0.0
+
+    @property
+    def prompt_tokens(self) -> int:
+        return sum(r.input_tokens for r in self.results)
+
+    @property
+    def cost_usd(self) -> float:
+        return round(sum(r.cost_usd for r in self.results), 6)
+
+    def latency_percentile_ms(self, pct: float) -> float:
+        """Nearest-rank percentile of per-question latency."""
+        latencies = sorted(r.latency_ms for r in self.results)
+        if not latencies:
+            return 0.0
+        return latencies[max(0, math.ceil(pct / 100 * len(latencies)) - 1)]
+
+    def to_dict(self) -> dict:
+        return {
+            "config": self.config.name,
+            "accuracy": round(self.accuracy, 3),
+            "mean_score": round(self.mean_score, 3),
+            "prompt_tokens": self.prompt_tokens,
+            "cost_usd": self.cost_usd,
+            "latency_p50_ms": round(self.latency_percentile_ms(50), 1),
+            "latency_p95_ms": round(self.latency_percentile_ms(95), 1),
+            "results": [asdict(r) for r in self.results],
+        }
+
+
+def score_answer(answer: str, golden: GoldenQuestion) -> tuple[bool, float]:
+    """
+    Score an answer against a golden question.
+
+    Returns (passed, score): score is the fraction of keywords found
+    (case-insensitive, as whole words - "4" does not match "2024"); an exact
+    expectation must match after whitespace/case normalisation. Passing
+    requires every check to succeed.
+    """
+    text = answer.lower()
+    checks: list[bool] = []
+
+    if golden.exact is not None:
+        checks.append(" ".join(text.split()) == " ".join(golden.exact.lower().split()))
+    for keyword in golden.keywords:
+        checks.append(any(
+            re.search(rf"(?<!\w){re.escape(alt.strip().lower())}(?!\w)", text) for alt in keyword.split("|")
+        ))
+
+    if not checks:
+        return False, 0.0
+    return all(checks), sum(checks) / len(checks)
+
+
+def load_golden(path: Path = FIXTURES_DIR / "golden.json") -> list[GoldenQuestion]:
+    return [GoldenQuestion(**item) for item in json.loads(path.read_text(encoding="utf-8"))]
+
+
+def use_eval_database(db_name: str | None = None) -> None:
+    """
+    Point every Database() in this process at the eval schema of a scratch
+    database (db_name, else EVAL_DB_NAME). Refuses the configured DB_NAME,
+    so evals can never read or overwrite the real catalogue.
+    """
+    settings = get_settings()
+    db_name = db_name or settings.eval_db_name
+    if not db_name:
+        raise ValueError("Evals need a scratch database: pass --db-name or set EVAL_DB_NAME")
+    if db_name == settings.db_name:
+        raise ValueError(f"Refusing to use DB_NAME ({db_name}) for evals - pass a scratch database")
+    if not _SCHEMA_NAME_RE.match(settings.eval_db_schema):
+        raise ValueError(f"Invalid EVAL_DB_SCHEMA: {settings.eval_db_schema!r}")
+
+    os.environ.update(DB_NAME=db_name, EVAL_DB_NAME=db_name, DB_SCHEMA=settings.eval_db_schema)
+    get_settings.cache_clear()
+    get_query_cache().clear()
+
+
+async def seed_fixture_catalogue(db: Database | None = None) -> None:
+    """(Re)create the fixture catalogue, asset clusters, rollups and project summaries - see use_eval_database()."""
+    settings = get_settings()
+    on_scratch_schema = (
+        settings.eval_db_name is not None
+        and settings.db_name == settings.eval_db_name
+        and settings.db_schema == settings.eval_db_schema
+    )
+    if not on_scratch_schema:
+        raise RuntimeError("Seeding truncates tables - call use_eval_database() first")
+
+    db = db or Database()
+    # The schema must exist before the first table is created on the search_path
+    await db.execute_write(f"CREATE SCHEMA IF NOT EXISTS {settings.eval_db_schema}")
+    for script in SEED_SCRIPTS:
+        await db.execute_write(script.read_text(encoding="utf-8"))
+    await assign_clusters(db)
+    await db.refresh_rollups()
+
+
+async def _run_question(config: EvalConfig, golden: GoldenQuestion, model: RecordingModel | ReplayModel) -> QuestionResult:
+    result = QuestionResult(question=golden.question)
+    if isinstance(model, ReplayModel):
+        model.replayed_latency_ms = 0.0
+
+    start = perf_counter()
+    try:
+        response = await ask(
+            golden.question,
+            context_mode=config.context_mode,
+            prompt=config.prompt,
+            model=config.model,
+        )
+    except Exception as e:
+        result.error = str(e)
+        return result
+    result.latency_ms = round((perf_counter() - start) * 1000 + getattr(model, "replayed_latency_ms", 0.0), 1)
+
+    result.answer = response.result.answer
+    result.passed, result.score = score_answer(result.answer, golden)
+    result.input_tokens = response.usage.input_tokens
+    result.output_tokens = response.usage.output_tokens
+    result.cost_usd = response.usage.total_cost_usd
+    return result
+
+
+async def run_eval(
+    configs: list[EvalConfig],
+    questions: list[GoldenQuestion] | None = None,
+    mode: Literal["replay", "record"] = "replay",
+) -> list[ConfigReport]:
+    """Run every golden question for every configuration."""
+    questions = questions if questions is not None else load_golden()
+    reports = []
+
+    for config in configs:
+        cassette = Cassette(CASSETTES_DIR / f"{config.name}.json")
+        if mode == "record":
+            model = RecordingModel(f"openai:{config.model}", cassette)
+        else:
+            model = ReplayModel(config.model, cassette)
+
+        with agent.override(model=model):
+            results = [await _run_question(config, golden, model) for golden in questions]
+
+        if mode == "record":
+            cassette.save()
+        reports.append(ConfigReport(config=config, results=results))
+
+    return reports
+
+
+def format_report(reports: list[ConfigReport]) -> str:
+    header = f"{'config':<40} {'acc':>6} {'score':>6} {'prompt tok':>11} {'cost $':>10} {'p50 ms':>9} {'p95 ms':>9}"
+    lines = [header, "-" * len(header)]
+    for r in reports:
+        lines.append(
+            f"{r.config.name:<40} {r.accuracy:>6.0%} {r.mean_score:>6.2f} {r.prompt_tokens:>11} "
+            f"{r.cost_usd:>10.6f} {r.latency_percentile_ms(50):>9.0f} {r.latency_percentile_ms(95):>9.0f}"
+        )
+        for q in r.results:
+            if q.error:
+                lines.append(f"    ! {q.question[:60]}: {q.error[:120]}")
+    return "\n".join(lines)
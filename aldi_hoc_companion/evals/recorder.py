@@ -0,0 +1,109 @@
+"""
+Record/replay layer for model responses.
+
+In record mode every model request goes to the real provider and the
+response (with its token usage and latency) is stored in a cassette file,
+keyed by a hash of the request messages. In replay mode the same requests
+are answered from the cassette, so eval runs are offline and deterministic.
+"""
+import hashlib
+import json
+from pathlib import Path
+from time import perf_counter
+
+from pydantic_ai.messages import ModelMessage, ModelMessagesTypeAdapter, ModelResponse
+from pydantic_ai.models import Model, ModelRequestParameters
+from pydantic_ai.models.wrapper import WrapperModel
+from pydantic_ai.settings import ModelSettings
+
+
+class Cassette:
+    """Recorded model responses for one eval configuration, stored as JSON."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self._entries: dict[str, dict] = {}
+        if self.path.exists():
+            self._entries = json.loads(self.path.read_text(encoding="utf-8"))
+
+    @staticmethod
+    def key(model_name: str, messages: list[ModelMessage]) -> str:
+        """Stable request key: model name + kind/content of every message part (no timestamps or ids)."""
+        parts = [
+            [part.part_kind, getattr(part, "tool_name", None), str(getattr(part, "content", getattr(part, "args", "")))]
+            for message in messages
+            for part in message.parts
+        ]
+        payload = json.dumps([model_name, parts], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> tuple[ModelResponse, float]:
+        entry = self._entries[key]
+        response = ModelMessagesTypeAdapter.validate_python([entry["response"]])[0]
+        return response, entry["latency_ms"]
+
+    def put(self, key: str, response: ModelResponse, latency_ms: float) -> None:
+        self._entries[key] = {
+            "response": ModelMessagesTypeAdapter.dump_python([response], mode="json")[0],
+            "latency_ms": round(latency_ms, 1),
+        }
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps(self._entries, ensure_ascii=False, indent=1), encoding="utf-8")
+
+
+class RecordingModel(WrapperModel):
+    """Calls the real model and stores every response in the cassette."""
+
+    def __init__(self, wrapped: Model | str, cassette: Cassette):
+        super().__init__(wrapped)
+        self.cassette = cassette
+
+    async def request(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+    ) -> ModelResponse:
+        start = perf_counter()
+        response = await super().request(messages, model_settings, model_request_parameters)
+        latency_ms = (perf_counter() - start) * 1000
+        self.cassette.put(Cassette.key(self.model_name, messages), response, latency_ms)
+        return response
+
+
+class ReplayModel(Model):
+    """Answers requests from a cassette; never touches the network."""
+
+    def __init__(self, model_name: str, cassette: Cassette):
+        super().__init__()
+        self._model_name = model_name
+        self.cassette = cassette
+        self.replayed_latency_ms = 0.0
+
+    @property
+    def model_name(self) -> str:
+        return self._model_name
+
+    @property
+    def system(self) -> str:
+        return "openai"
+
+    async def request(
+        self,
+        messages: list[ModelMessage],
+        model_settings: ModelSettings | None,
+        model_request_parameters: ModelRequestParameters,
+    ) -> ModelResponse:
+        key = Cassette.key(self._model_name, messages)
+        try:
+            response, latency_ms = self.cassette.get(key)
+        except KeyError:
+            raise KeyError(
+                f"No recorded response in {self.cassette.path.name} for this request - "
+                "re-record with: python -m aldi_hoc_companion.evals --mode record"
+            ) from None
+        # Recorded provider latency is reported as if the call had been made
+        self.replayed_latency_ms += latency_ms
+        return response
@@ -1,5 +1,6 @@
 from .app_models import ChatRequest, ChatResponse, ModelInfo, ModelsResponse, TokenUsageResponse
-from .agent_models import AgentDeps, AgentResponse, QueryResult, TokenUsage
+from .agent_models import AgentDeps, AgentResponse, QueryResult, QuestionFilters, TokenUsage
+from .logging_models import DBStats, RequestStats, ResponseStats, TokenStats
 
 __all__ = [
     "ChatRequest",
@@ -10,5 +11,10 @@ __all__ = [
     "AgentDeps",
     "AgentResponse",
     "QueryResult",
+    "QuestionFilters",
     "TokenUsage",
+    "DBStats",
+    "RequestStats",
+    "ResponseStats",
+    "TokenStats",
 ]
@@ -1,12 +1,33 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from pydantic import BaseModel, Field
+from aldi_hoc_companion.core.config import ContextMode, PromptVariant
 from aldi_hoc_companion.db import Database
+from aldi_hoc_companion.models.logging_models import DBStats
+
+
+@dataclass(frozen=True)
+class QuestionFilters:
+    """Hard constraints found in the question (see agent/filters.py)."""
+    years: tuple[int, ...] = ()
+    languages: tuple[str, ...] = ()
+    asset_kinds: tuple[str, ...] = ()
+    campaign_context: str | None = None
+
+    def __bool__(self) -> bool:
+        return bool(self.years or self.languages or self.asset_kinds or self.campaign_context)
+
+    @property
+    def has_asset_filters(self) -> bool:
+        return bool(self.languages or self.asset_kinds or self.campaign_context)
 
 
 @dataclass
 class AgentDeps:
     db: Database
     question: str
+    context_mode: ContextMode = "full"
+    prompt: PromptVariant = "inline"
+    filters: QuestionFilters = field(default_factory=QuestionFilters)
 
 
 class TokenUsage(BaseModel):
@@ -17,6 +38,11 @@ class TokenUsage(BaseModel):
     output_cost_usd: float = 0.0
     total_cost_usd: float = 0.0
     model: str = ""
+    retries: int = 0
+    hedges: int = 0
+    hedge_wins: int = 0
+    failovers: int = 0
+    extra_cost_usd: float = 0.0  # estimated cost of abandoned retry/hedge calls, not in total_cost_usd
 
 
 class QueryResult(BaseModel):
@@ -28,3 +54,5 @@ class QueryResult(BaseModel):
 class AgentResponse(BaseModel):
     result: QueryResult
     usage: TokenUsage
+    session_id: str | None = None
+    db_stats: DBStats | None = None
@@ -2,6 +2,7 @@ from pydantic import BaseModel, Field
 
 class ChatRequest(BaseModel):
     question: str
+    session_id: str | None = Field(default=None, description="Continue an existing conversation")
 
 
 class TokenUsageResponse(BaseModel):
@@ -13,6 +14,11 @@ class TokenUsageResponse(BaseModel):
     output_cost_usd: float = Field(description="Cost of output tokens in USD")
     total_cost_usd: float = Field(description="Total cost in USD")
     model: str = Field(description="Model used for the request")
+    retries: int = Field(default=0, description="Model requests retried after transient errors")
+    hedges: int = Field(default=0, description="Hedged requests sent to the fallback model")
+    hedge_wins: int = Field(default=0, description="Hedged requests answered by the fallback model")
+    failovers: int = Field(default=0, description="Requests failed over to the fallback model")
+    extra_cost_usd: float = Field(default=0.0, description="Estimated cost of abandoned calls (not in total)")
 
 
 class ChatResponse(BaseModel):
@@ -20,6 +26,7 @@ class ChatResponse(BaseModel):
     sql_used: str | None = None
     row_count: int = 0
     usage: TokenUsageResponse = Field(description="Token usage and cost breakdown")
+    session_id: str | None = Field(default=None, description="Pass back to ask follow-up questions")
 
 
 class ModelInfo(BaseModel):
@@ -9,6 +9,8 @@ class DBStats:
     query_count: int = 0
     total_query_time_ms: float = 0.0
     last_query_time_ms: float = 0.0
+    cache_hits: int = 0
+    cache_misses: int = 0
 
 
 @dataclass
@@ -39,4 +41,9 @@ class TokenStats:
     total_tokens: int = 0
     input_cost_usd: float = 0.0
     output_cost_usd: float = 0.0
-    total_cost_usd: float = 0.0
\ No newline at end of file
+    total_cost_usd: float = 0.0
+    retries: int = 0
+    hedges: int = 0
+    hedge_wins: int = 0
+    failovers: int = 0
+    extra_cost_usd: float = 0.0
\ No newline at end of file
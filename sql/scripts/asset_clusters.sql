@@ -0,0 +1,13 @@
+-- =====================================================
+-- Near-duplicate clusters of assets (versions and
+-- language variants of the same banner, video, ...).
+-- cluster_id is the lowest asset id in the cluster; NULL
+-- until the clustering job has seen the asset:
+--   python -m aldi_hoc_companion.db.dedup
+-- Optional: without the column, contexts list every
+-- asset on its own line.
+-- =====================================================
+
+ALTER TABLE assets ADD COLUMN IF NOT EXISTS cluster_id INTEGER;
+
+CREATE INDEX IF NOT EXISTS idx_assets_cluster ON assets (project_id, cluster_id);
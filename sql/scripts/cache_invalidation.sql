@@ -0,0 +1,30 @@
+-- =====================================================
+-- Notify API processes when catalogue tables change, so
+-- their in-memory query caches drop stale results
+-- (Database.start_invalidation_listener, DB_CACHE_NOTIFY_CHANNEL).
+-- The payload is the changed table name. Ingestion code that
+-- bypasses these triggers can send the notification itself:
+--   NOTIFY query_cache, 'assets';
+-- =====================================================
+
+CREATE OR REPLACE FUNCTION notify_query_cache() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('query_cache', TG_TABLE_NAME);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS projects_notify_query_cache ON projects;
+CREATE TRIGGER projects_notify_query_cache
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON projects
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_query_cache();
+
+DROP TRIGGER IF EXISTS assets_notify_query_cache ON assets;
+CREATE TRIGGER assets_notify_query_cache
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON assets
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_query_cache();
+
+DROP TRIGGER IF EXISTS project_summaries_notify_query_cache ON project_summaries;
+CREATE TRIGGER project_summaries_notify_query_cache
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON project_summaries
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_query_cache();
@@ -0,0 +1,15 @@
+-- =====================================================
+-- One LLM-generated summary paragraph per project, used by
+-- the "hierarchical" agent context. content_hash is an md5
+-- over the project's name/year and asset contents, so a
+-- summary is only regenerated when the project changes:
+--   python -m aldi_hoc_companion.agent.summaries
+-- =====================================================
+
+CREATE TABLE IF NOT EXISTS project_summaries (
+    project_id INTEGER PRIMARY KEY REFERENCES projects(id) ON DELETE CASCADE,
+    content_hash TEXT NOT NULL,
+    summary TEXT NOT NULL,
+    model TEXT NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
@@ -0,0 +1,99 @@
+-- =====================================================
+-- Rollup materialized views used for the compact
+-- "summary" agent context. Their size depends on the
+-- number of projects, not the number of assets.
+--
+-- Every view has a UNIQUE index so it can be refreshed
+-- with REFRESH MATERIALIZED VIEW CONCURRENTLY (readers
+-- are never blocked). Refresh after each ingestion run
+-- (after the dedup job, before the summaries):
+--   python -m aldi_hoc_companion.db.rollups
+-- =====================================================
+
+-- Projects and assets per year
+CREATE MATERIALIZED VIEW IF NOT EXISTS rollup_year AS
+SELECT
+    p.year,
+    COUNT(DISTINCT p.id) AS project_count,
+    COUNT(a.id) AS asset_count
+FROM projects p
+LEFT JOIN assets a ON a.project_id = p.id
+GROUP BY p.year;
+
+CREATE UNIQUE INDEX IF NOT EXISTS rollup_year_uq ON rollup_year (year);
+
+
+-- Asset counts per project, split into briefing vs execution
+CREATE MATERIALIZED VIEW IF NOT EXISTS rollup_project AS
+SELECT
+    p.id,
+    p.project_id,
+    p.project_name,
+    p.year,
+    COUNT(a.id) AS asset_count,
+    COUNT(a.id) FILTER (WHERE a.campaign_context = 'briefing') AS briefing_count,
+    COUNT(a.id) FILTER (WHERE a.campaign_context = 'execution') AS execution_count
+FROM projects p
+LEFT JOIN assets a ON a.project_id = p.id
+GROUP BY p.id, p.project_id, p.project_name, p.year;
+
+CREATE UNIQUE INDEX IF NOT EXISTS rollup_project_uq ON rollup_project (id);
+
+
+-- asset_kind x language matrix
+CREATE MATERIALIZED VIEW IF NOT EXISTS rollup_kind_language AS
+SELECT
+    COALESCE(a.asset_kind, 'unknown') AS asset_kind,
+    COALESCE(a.language, 'None') AS language,
+    COUNT(*) AS asset_count
+FROM assets a
+GROUP BY 1, 2;
+
+CREATE UNIQUE INDEX IF NOT EXISTS rollup_kind_language_uq ON rollup_kind_language (asset_kind, language);
+
+
+-- Asset counts per project x kind x language x campaign context:
+-- lets the summary context apply question filters (year, language,
+-- kind, briefing/execution) to every count without reading assets
+CREATE MATERIALIZED VIEW IF NOT EXISTS rollup_project_facets AS
+SELECT
+    p.id AS project_id,
+    p.year,
+    COALESCE(a.asset_kind, 'unknown') AS asset_kind,
+    COALESCE(a.language, 'None') AS language,
+    COALESCE(a.campaign_context, 'unknown') AS campaign_context,
+    COUNT(*) AS asset_count
+FROM projects p
+JOIN assets a ON a.project_id = p.id
+GROUP BY 1, 2, 3, 4, 5;
+
+CREATE UNIQUE INDEX IF NOT EXISTS rollup_project_facets_uq
+    ON rollup_project_facets (project_id, asset_kind, language, campaign_context);
+
+
+-- Top 10 keywords per project (from asset_content)
+CREATE MATERIALIZED VIEW IF NOT EXISTS rollup_project_keywords AS
+WITH words AS (
+    SELECT a.project_id, w AS keyword
+    FROM assets a,
+         regexp_split_to_table(lower(COALESCE(a.asset_content, '')), '[^[:alpha:]]+') AS w
+    WHERE length(w) >= 4
+      AND w NOT IN (
+          'with', 'that', 'this', 'from', 'have', 'image', 'shows', 'showing', 'text', 'background',
+          'voor', 'zijn', 'naar', 'deze', 'wordt', 'avec', 'pour', 'dans', 'sont'
+      )
+),
+ranked AS (
+    SELECT
+        project_id,
+        keyword,
+        COUNT(*) AS occurrences,
+        ROW_NUMBER() OVER (PARTITION BY project_id ORDER BY COUNT(*) DESC, keyword) AS rank
+    FROM words
+    GROUP BY project_id, keyword
+)
+SELECT project_id, keyword, occurrences, rank
+FROM ranked
+WHERE rank <= 10;
+
+CREATE UNIQUE INDEX IF NOT EXISTS rollup_project_keywords_uq ON rollup_project_keywords (project_id, keyword);
@@ -0,0 +1,181 @@
+import asyncio
+import re
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+from pydantic_ai.messages import ModelRequest, ModelResponse, SystemPromptPart, TextPart, UserPromptPart
+
+from aldi_hoc_companion.agent import context
+from aldi_hoc_companion.agent.context import build_context, context_filters
+from aldi_hoc_companion.db.db import RowBatch
+from aldi_hoc_companion.models.agent_models import QuestionFilters
+
+
+class FakeDatabase:
+    """Answers the summary-mode stage queries; the per-year query is slow."""
+
+    def __init__(self, fail_projects: bool = False):
+        self.fail_projects = fail_projects
+        self.cancelled: list[str] = []
+
+    async def execute(self, sql, params=()):
+        if "rollup_year" in sql or "GROUP BY r.year" in sql:
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                self.cancelled.append("rollup_year")
+                raise
+            return []
+        if "rollup_kind_language" in sql or "GROUP BY r.asset_kind" in sql:
+            return [{"asset_kind": "banner", "language": "Dutch", "asset_count": 3}]
+        if self.fail_projects:
+            raise RuntimeError("connection lost")
+        return [{
+            "project_name": "Kerstcampagne 2024", "year": 2024, "asset_count": 4,
+            "briefing_count": 1, "execution_count": 3, "keywords": "stollen, kalkoen",
+        }]
+
+
+@pytest.fixture(autouse=True)
+def clear_last_good():
+    context._last_good.clear()
+    context._cluster_keys.clear()
+    with patch.object(context, "STATS_STAGE_TIMEOUT_SECONDS", 0.05), \
+            patch.object(context, "get_logger", MagicMock()):
+        yield
+
+
+def test_slow_optional_stage_is_skipped():
+    content = asyncio.run(build_context(FakeDatabase(), "summary"))
+
+    assert "Kerstcampagne 2024 (2024): 4 assets (briefing 1, execution 3) | keywords: stollen, kalkoen" in content
+    assert "banner / Dutch: 3" in content
+    assert "BY YEAR" not in content
+    assert "INCOMPLETE DATA (live query failed) - years: missing" in content
+
+
+def test_failed_required_stage_falls_back_to_last_good_result():
+    first = asyncio.run(build_context(FakeDatabase(), "summary"))
+    degraded = asyncio.run(build_context(FakeDatabase(fail_projects=True), "summary"))
+    assert "years: missing; projects: result from 0s ago" in degraded
+    assert degraded.split("--- PROJECTS")[1] == first.split("--- PROJECTS")[1]
+
+    context._last_good.clear()
+    with pytest.raises(RuntimeError):
+        asyncio.run(build_context(FakeDatabase(fail_projects=True), "summary"))
+
+
+def test_last_good_results_are_bounded_and_expire():
+    last_good = context._LastGood(max_entries=2, max_age_seconds=60)
+    for key in ("a", "b", "c"):
+        last_good.put(key, key.upper())
+    assert last_good.get("a") is None
+    assert last_good.get("c")[0] == "C"
+
+    with patch.object(context.time, "monotonic", return_value=time.monotonic() + 120):
+        assert last_good.get("c") is None
+
+
+def test_failed_required_stage_cancels_the_other_stages():
+    db = FakeDatabase(fail_projects=True)
+    start = time.perf_counter()
+    with patch.object(context, "STATS_STAGE_TIMEOUT_SECONDS", 10), pytest.raises(RuntimeError):
+        asyncio.run(build_context(db, "summary"))
+
+    assert db.cancelled == ["rollup_year"]
+    assert time.perf_counter() - start < 1
+
+
+def test_filters_are_pushed_into_stage_queries():
+    db = FakeDatabase()
+    queries = []
+    execute = db.execute
+
+    async def recording_execute(sql, params=()):
+        queries.append((sql, params))
+        return await execute(sql, params)
+
+    db.execute = recording_execute
+    content = asyncio.run(build_context(db, "summary", QuestionFilters(years=(2024,), asset_kinds=("banner",))))
+
+    assert "FILTERED to rows matching the question: year 2024; asset kind banner" in content
+    assert "all counts are filtered" in content
+    kind_language_sql, params = next(q for q in queries if "GROUP BY r.asset_kind" in q[0])
+    assert "r.year = ANY(%s) AND lower(r.asset_kind) = ANY(%s)" in kind_language_sql
+    assert params == ([2024], ["banner"])
+    # Summary mode never touches the assets table, filtered or not
+    assert queries and not any(re.search(r"\bassets\b", sql) for sql, _ in queries)
+
+
+class AssetsDatabase:
+    """Streams asset rows for the full-mode asset stage, with or without assets.cluster_id."""
+
+    def __init__(self, has_cluster_id: bool):
+        self.has_cluster_id = has_cluster_id
+        self.queries: list[str] = []
+        self.column_checks = 0
+
+    async def has_column(self, table, column):
+        self.column_checks += 1
+        return self.has_cluster_id
+
+    async def execute_stream(self, sql, params=()):
+        self.queries.append(sql)
+        yield RowBatch(
+            columns=("asset_kind", "project_name", "contents", "variant_count", "languages", "versions"),
+            rows=[("banner", "Kerstcampagne 2024", ["Kerstbanner", "Kerstbanner"], 2, "Dutch, French", None)],
+        )
+
+
+@pytest.mark.parametrize("has_cluster_id, group_key", [(True, "COALESCE(a.cluster_id, a.id)"), (False, "a.id")])
+def test_asset_lines_group_by_cluster_only_when_the_column_exists(has_cluster_id, group_key):
+    db = AssetsDatabase(has_cluster_id)
+    lines = asyncio.run(context._fetch_asset_lines(db, QuestionFilters()))
+
+    assert lines == ["[banner] Kerstcampagne 2024: Kerstbanner (2 variants: Dutch, French)\n"]
+    assert f"GROUP BY p.id, p.year, p.project_name, {group_key}\n" in db.queries[0]
+    assert has_cluster_id or "cluster_id" not in db.queries[0]
+
+
+def test_cluster_column_check_is_cached_until_its_ttl():
+    db = AssetsDatabase(has_cluster_id=False)
+    for _ in range(3):
+        asyncio.run(context._fetch_asset_lines(db, QuestionFilters()))
+    assert db.column_checks == 1
+
+    # The migration is applied: picked up once the cached answer expires
+    db.has_cluster_id = True
+    with patch.object(context.time, "monotonic", return_value=time.monotonic() + context.CLUSTER_KEY_TTL_SECONDS + 1):
+        asyncio.run(context._fetch_asset_lines(db, QuestionFilters()))
+    assert db.column_checks == 2
+    assert "COALESCE(a.cluster_id, a.id)" in db.queries[-1]
+
+
+def test_follow_up_with_other_filters_gets_a_fresh_context():
+    from aldi_hoc_companion.agent.qa_agent import FOLLOW_UP_CONTEXT_NOTE, _refresh_context
+    from aldi_hoc_companion.models.agent_models import AgentDeps
+
+    db = FakeDatabase()
+    first = asyncio.run(build_context(db, "summary", QuestionFilters(years=(2024,), languages=("French",))))
+    history = [
+        ModelRequest(parts=[SystemPromptPart(content=first), UserPromptPart(content="French banners in 2024?")]),
+        ModelResponse(parts=[TextPart(content="Two.")]),
+    ]
+    assert context_filters(history) == QuestionFilters(years=(2024,), languages=("French",))
+
+    same = AgentDeps(
+        db=db, question="Which ones?", context_mode="summary",
+        filters=QuestionFilters(years=(2024,), languages=("French",)),
+    )
+    assert asyncio.run(_refresh_context(history, same)) is history
+    # No filters ("Tell me more about the first one") or narrower ones: the context already holds the rows
+    for filters in (QuestionFilters(), QuestionFilters(years=(2024,), languages=("French",), asset_kinds=("banner",))):
+        follow_up = AgentDeps(db=db, question="Tell me more", context_mode="summary", filters=filters)
+        assert asyncio.run(_refresh_context(history, follow_up)) is history
+
+    other = AgentDeps(db=db, question="and 2023?", context_mode="summary", filters=QuestionFilters(years=(2023,)))
+    refreshed = asyncio.run(_refresh_context(history, other))
+    assert refreshed[:2] == history
+    assert refreshed[-1].parts[0].content.startswith(FOLLOW_UP_CONTEXT_NOTE)
+    assert context_filters(refreshed) == QuestionFilters(years=(2023,))
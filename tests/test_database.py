@@ -0,0 +1,62 @@
+import asyncio
+import threading
+from types import SimpleNamespace
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from aldi_hoc_companion.db import Database, RowBatch
+
+
+def test_execute_stream_yields_compact_batches_from_named_cursor():
+    fake_cursor = MagicMock()
+    fake_cursor.fetchmany.side_effect = [
+        [("banner", "Kerst"), ("video", "Kerst")],
+        [("email", "Zomer")],
+        [],
+    ]
+    fake_cursor.description = [SimpleNamespace(name="asset_kind"), SimpleNamespace(name="project_name")]
+
+    fake_conn = MagicMock()
+    fake_conn.cursor.return_value = fake_cursor
+
+    async def collect():
+        return [batch async for batch in Database().execute_stream("SELECT ...", batch_size=2)]
+
+    with patch("aldi_hoc_companion.db.db.psycopg2.connect", return_value=fake_conn):
+        batches = asyncio.run(collect())
+
+    # Server-side (named) cursor with the requested itersize
+    assert fake_conn.cursor.call_args.kwargs["name"].startswith("stream_")
+    assert fake_cursor.itersize == 2
+    fake_conn.close.assert_called_once()
+
+    assert [len(b.rows) for b in batches] == [2, 1]
+    assert batches[0].columns == ("asset_kind", "project_name")
+    assert batches[0].as_dicts()[1] == {"asset_kind": "video", "project_name": "Kerst"}
+
+
+def test_row_batch_columnar_view():
+    batch = RowBatch(columns=("kind", "lang"), rows=[("banner", "Dutch"), ("email", "French")])
+    assert batch.as_columns() == {"kind": ("banner", "email"), "lang": ("Dutch", "French")}
+    assert RowBatch(columns=("kind",), rows=[]).as_columns() == {"kind": ()}
+
+
+def test_execute_timeout_cancels_query_on_server():
+    cancelled = threading.Event()
+
+    fake_cursor = MagicMock()
+    # The "query" blocks until the connection is cancelled, like a slow statement would
+    fake_cursor.execute.side_effect = lambda *args: cancelled.wait(5)
+
+    fake_conn = MagicMock()
+    fake_conn.cursor.return_value.__enter__.return_value = fake_cursor
+    fake_conn.cancel.side_effect = cancelled.set
+
+    with patch("aldi_hoc_companion.db.db.psycopg2.connect", return_value=fake_conn):
+        with pytest.raises(TimeoutError):
+            asyncio.run(Database().execute("SELECT pg_sleep(60)", timeout=0.1))
+
+    fake_conn.cancel.assert_called_once()
+    # Per-query timeout is also enforced server-side
+    fake_cursor.execute.assert_any_call("SET LOCAL statement_timeout = %s", (100,))
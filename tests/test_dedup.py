@@ -0,0 +1,83 @@
+from aldi_hoc_companion.agent.context import _format_asset_lines, variant_differences, variants_note
+from aldi_hoc_companion.db.dedup import cluster_assets, file_stem, hamming_distance, simhash
+
+
+def _asset(asset_id, file_name, content, project_id=1, asset_kind="banner"):
+    return {
+        "id": asset_id, "project_id": project_id, "asset_kind": asset_kind,
+        "file_name": file_name, "asset_content": content,
+    }
+
+
+def test_file_stem_drops_language_and_version_markers():
+    assert file_stem("kerst_banner_NL_v1.psd") == "kerst_banner"
+    assert file_stem("Kerst-Banner FR v2.jpg") == "kerst_banner"
+    assert file_stem("kwaliteit_video_30s.mp4") == "kwaliteit_video_30s"
+    # Plain numbers are part of the name, not a variant marker
+    assert file_stem("banner_1.jpg") == "banner_1"
+    assert file_stem("folder_week_12_NL.pdf") == "folder_week_12"
+
+
+def test_simhash_is_close_for_variants_and_far_for_unrelated_content():
+    dutch = simhash("Festive dinner table with roast turkey, stollen and candles. Text: Zalig Kerstfeest.")
+    french = simhash("Festive dinner table with roast turkey, stollen and candles. Text: Joyeux Noël.")
+    other = simhash("Chocolate Easter eggs and bunnies in a spring basket with daffodils.")
+
+    assert hamming_distance(dutch, french) < hamming_distance(dutch, other)
+    assert simhash("Joyeux Noël") == simhash("joyeux noel")
+
+
+def test_cluster_assets_groups_variants_by_stem_and_content():
+    clusters = cluster_assets([
+        _asset(1, "kerst_banner_NL_v1.psd", "Roast turkey, stollen and candles. Text: Zalig Kerstfeest."),
+        _asset(2, "kerst_banner_FR_v1.psd", "Roast turkey, stollen and candles. Text: Joyeux Noel."),
+        _asset(3, "kerst_banner_NL_v2.psd", "Roast turkey, stollen and candles. Text: Zalig Kerstfeest!"),
+        # Same content but another project / another kind: never merged
+        _asset(4, "kerst_banner_NL_v1.psd", "Roast turkey, stollen and candles. Text: Zalig Kerstfeest.", project_id=2),
+        _asset(5, "kerst_banner_NL.mp4", "Roast turkey, stollen and candles. Text: Zalig Kerstfeest.", asset_kind="video"),
+        # Same stem, unrelated content
+        _asset(6, "kerst_banner_NL_v3.psd", "Chocolate Easter eggs and bunnies in a spring basket with daffodils."),
+    ])
+
+    assert clusters == {1: 1, 2: 1, 3: 1, 4: 4, 5: 5, 6: 6}
+
+
+def test_cluster_assets_keeps_different_banners_apart():
+    strawberries = "Fresh Belgian strawberries in a punnet on a wooden table. Text: Verse aardbeien."
+    asparagus = "Fresh Belgian asparagus bundled on a wooden table. Text: Verse asperges."
+    clusters = cluster_assets([
+        # Numbered files are separate assets, however alike their descriptions
+        _asset(1, "banner_1.jpg", strawberries),
+        _asset(2, "banner_2.jpg", strawberries.replace("strawberries", "cherries")),
+        _asset(3, "folder_week_12.pdf", "Weekly folder with fresh produce offers."),
+        _asset(4, "folder_week_13.pdf", "Weekly folder with fresh produce offers."),
+        # Same stem, but another product
+        _asset(5, "lente_banner_NL_v1.psd", strawberries),
+        _asset(6, "lente_banner_NL_v2.psd", asparagus),
+    ])
+
+    assert clusters == {1: 1, 2: 2, 3: 3, 4: 4, 5: 5, 6: 6}
+
+
+def test_collapsed_assets_report_variants():
+    lines = _format_asset_lines([
+        ("banner", "Kerstcampagne 2024", ["Roast turkey", "Roast turkey", "Roast turkey"], 3, "Dutch, French", "1, 2"),
+        ("video", "Kerstcampagne 2024", ["Christmas tree"], 1, "Multilingual", None),
+    ])
+    assert lines == [
+        "[banner] Kerstcampagne 2024: Roast turkey (3 variants: Dutch, French; versions 1, 2)\n",
+        "[video] Kerstcampagne 2024: Christmas tree\n",
+    ]
+
+
+def test_variants_keep_the_text_that_differs():
+    contents = [
+        'Kerstbanner met slogan "Zalig Kerstfeest" en kerstboom',
+        'Kerstbanner met slogan "Joyeux Noel" en kerstboom',
+        "Kerstbanner met slogan en kerstboom, rode achtergrond",
+        'Kerstbanner met slogan "Zalig Kerstfeest" en kerstboom',
+    ]
+    assert variant_differences(contents) == ['"Joyeux Noel"', "rode achtergrond"]
+    assert variants_note(4, "Dutch, French", None, contents) == (
+        ' (4 variants: Dutch, French; other variants: "Joyeux Noel" | rode achtergrond)'
+    )
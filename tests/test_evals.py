@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+from pydantic_ai import Agent
+from pydantic_ai.models.test import TestModel
+
+from aldi_hoc_companion.core.config import get_settings
+from aldi_hoc_companion.evals import Cassette, GoldenQuestion
+from aldi_hoc_companion.evals.harness import score_answer, seed_fixture_catalogue, use_eval_database
+from aldi_hoc_companion.evals.recorder import RecordingModel, ReplayModel
+
+
+def test_score_answer_keywords_and_alternatives():
+    golden = GoldenQuestion(question="q", keywords=["bbq", "kerst|christmas"])
+
+    assert score_answer("The BBQ and Christmas campaigns.", golden) == (True, 1.0)
+    assert score_answer("Only the BBQ campaign.", golden) == (False, 0.5)
+
+
+def test_score_answer_exact_ignores_case_and_whitespace():
+    golden = GoldenQuestion(question="q", exact="Four projects")
+    assert score_answer("  four   PROJECTS ", golden) == (True, 1.0)
+
+
+def test_record_then_replay_offline(tmp_path):
+    path = tmp_path / "cassette.json"
+
+    cassette = Cassette(path)
+    recording = RecordingModel(TestModel(custom_output_text="Vier projecten."), cassette)
+    recorded = asyncio.run(Agent(recording).run("Hoeveel projecten?"))
+    cassette.save()
+
+    replay = ReplayModel("test", Cassette(path))
+    replayed = asyncio.run(Agent(replay).run("Hoeveel projecten?"))
+
+    assert replayed.output == recorded.output == "Vier projecten."
+    assert replayed.usage.input_tokens == recorded.usage.input_tokens
+    assert replay.replayed_latency_ms >= 0
+
+
+def test_replay_fails_loudly_on_unrecorded_request(tmp_path):
+    replay = ReplayModel("test", Cassette(tmp_path / "empty.json"))
+    with pytest.raises(KeyError, match="re-record"):
+        asyncio.run(Agent(replay).run("Nieuwe vraag"))
+
+
+def test_score_answer_matches_whole_words_only():
+    golden = GoldenQuestion(question="q", keywords=["4|four"])
+
+    assert score_answer("There are 3 projects, the newest from 2024.", golden) == (False, 0.0)
+    assert score_answer("There are 4 projects.", golden) == (True, 1.0)
+    assert score_answer("Four projects (2023-2025).", golden) == (True, 1.0)
+
+
+def test_evals_refuse_the_configured_database():
+    settings = get_settings()
+    with pytest.raises(ValueError, match="scratch database"):
+        use_eval_database(None)
+    with pytest.raises(ValueError, match="Refusing"):
+        use_eval_database(settings.db_name)
+    with pytest.raises(RuntimeError, match="use_eval_database"):
+        asyncio.run(seed_fixture_catalogue())
+
+
+def test_use_eval_database_switches_to_the_eval_schema(monkeypatch):
+    for name in ("DB_NAME", "DB_SCHEMA", "EVAL_DB_NAME"):
+        monkeypatch.delenv(name, raising=False)
+    get_settings.cache_clear()
+    try:
+        use_eval_database("aldi_eval")
+        settings = get_settings()
+        assert (settings.db_name, settings.db_schema) == ("aldi_eval", "eval_fixture")
+    finally:
+        for name in ("DB_NAME", "DB_SCHEMA", "EVAL_DB_NAME"):
+            monkeypatch.delenv(name, raising=False)
+        get_settings.cache_clear()
@@ -0,0 +1,95 @@
+from aldi_hoc_companion.agent.filters import (
+    asset_where,
+    covers,
+    describe,
+    extract_filters,
+    parse_description,
+    project_where,
+)
+from aldi_hoc_companion.models.agent_models import QuestionFilters
+
+
+def test_extracts_year_language_and_kind_in_english():
+    filters = extract_filters("Show me the French banners from 2024")
+    assert filters == QuestionFilters(years=(2024,), languages=("French",), asset_kinds=("banner",))
+
+
+def test_extracts_dutch_and_french_keywords():
+    assert extract_filters("Welke Nederlandstalige video's hadden we in 2023?") == QuestionFilters(
+        years=(2023,), languages=("Dutch",), asset_kinds=("video",),
+    )
+    assert extract_filters("Quelles bannières en français pour l'exécution ?") == QuestionFilters(
+        languages=("French",), asset_kinds=("banner",), campaign_context="execution",
+    )
+
+
+def test_reply_language_is_not_a_filter():
+    assert not extract_filters("Which campaigns ran at Christmas? Answer in English.")
+    assert extract_filters("Antwoord in het Frans: welke banners in het Nederlands?").languages == ("Dutch",)
+
+
+def test_negated_keywords_are_not_filters():
+    assert extract_filters("Which projects have no French assets?") == QuestionFilters()
+    assert extract_filters("Welke projecten zonder video's in 2023?") == QuestionFilters(years=(2023,))
+    assert extract_filters("Projets sans bannières ni briefing, pas d'anglais") == QuestionFilters()
+    # The keyword still counts where it also occurs without the negation
+    assert extract_filters("French banners without any French text").languages == ("French",)
+    assert extract_filters("Videos without a briefing").asset_kinds == ("video",)
+
+
+def test_exclusions_are_not_filters():
+    assert extract_filters("Which banners are not in French?") == QuestionFilters(asset_kinds=("banner",))
+    assert extract_filters("show everything except videos") == QuestionFilters()
+    assert extract_filters("Banners in a language other than Dutch") == QuestionFilters(asset_kinds=("banner",))
+    assert extract_filters("Welke banners zijn niet in het Frans?").languages == ()
+    assert extract_filters("Alles behalve video's") == QuestionFilters()
+    assert extract_filters("Toutes les bannieres sauf en anglais, hors videos").asset_kinds == ("banner",)
+
+
+def test_year_ranges_keep_every_year():
+    assert extract_filters("Campaigns from 2020 through 2024").years == (2020, 2021, 2022, 2023, 2024)
+    assert extract_filters("between 2021 and 2023").years == (2021, 2022, 2023)
+    assert extract_filters("Projecten van 2022 tot 2024").years == (2022, 2023, 2024)
+    assert extract_filters("Campagnes 2023-2024").years == (2023, 2024)
+    assert extract_filters("Banners from 2023 and 2025").years == (2023, 2025)
+
+
+def test_open_ended_and_compared_years_are_no_filter():
+    assert extract_filters("Which banners since 2023?") == QuestionFilters(asset_kinds=("banner",))
+    assert extract_filters("How did this year do compared to 2023?").years == ()
+    assert extract_filters("Projects before 2024").years == ()
+    assert extract_filters("Campagnes depuis 2022").years == ()
+    assert extract_filters("Welke projecten sinds 2023?").years == ()
+
+
+def test_briefing_and_execution_together_is_no_constraint():
+    assert extract_filters("Compare briefing and execution").campaign_context is None
+
+
+def test_where_clauses():
+    filters = QuestionFilters(years=(2024,), languages=("French",), campaign_context="briefing")
+
+    clause, params = asset_where(filters)
+    assert clause == "a.language = ANY(%s) AND a.campaign_context = %s"
+    assert params == [["French", "Multilingual"], "briefing"]
+
+    clause, params = project_where(filters, alias="r")
+    assert clause.startswith("r.year = ANY(%s) AND EXISTS (SELECT 1 FROM assets fa WHERE fa.project_id = r.id")
+    assert params == [[2024], ["French", "Multilingual"], "briefing"]
+
+    assert project_where(QuestionFilters()) == ("TRUE", [])
+    assert describe(filters) == "year 2024; language French; campaign context briefing"
+
+
+def test_description_round_trip_and_coverage():
+    filters = QuestionFilters(years=(2023, 2024), languages=("French",), asset_kinds=("banner", "video"),
+                              campaign_context="execution")
+    assert parse_description(describe(filters)) == filters
+    assert parse_description("") == QuestionFilters()
+
+    built_for = QuestionFilters(years=(2024,))
+    assert covers(built_for, QuestionFilters())
+    assert covers(built_for, QuestionFilters(years=(2024,), languages=("Dutch",)))
+    assert not covers(built_for, QuestionFilters(years=(2023,)))
+    assert not covers(built_for, QuestionFilters(languages=("Dutch",)))
+    assert covers(QuestionFilters(), QuestionFilters(years=(2023,)))
@@ -0,0 +1,108 @@
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from aldi_hoc_companion.db import Database
+from aldi_hoc_companion.db.cache import QueryCache, is_cacheable
+
+PROJECTS_SQL = "SELECT project_name FROM projects ORDER BY year DESC"
+
+
+def _put(cache: QueryCache, sql: str, rows: list) -> None:
+    cache.put(sql, (), rows, cache.snapshot(sql))
+
+
+def test_hit_ignores_whitespace_differences():
+    cache = QueryCache()
+    _put(cache, PROJECTS_SQL, [{"project_name": "Kerst"}])
+
+    assert cache.get("SELECT project_name\n  FROM projects   ORDER BY year DESC") == [{"project_name": "Kerst"}]
+    assert (cache.hits, cache.misses) == (1, 0)
+
+
+def test_table_version_bump_invalidates_only_readers_of_that_table():
+    cache = QueryCache()
+    assets_sql = "SELECT COUNT(*) FROM assets"
+    _put(cache, PROJECTS_SQL, [{"n": 1}])
+    _put(cache, assets_sql, [{"n": 2}])
+
+    cache.bump_for_statement("INSERT INTO assets (project_id) VALUES (1)")
+
+    assert cache.get(assets_sql) is None
+    assert cache.get(PROJECTS_SQL) == [{"n": 1}]
+
+
+def test_results_of_in_flight_queries_are_not_cached_after_a_bump():
+    cache = QueryCache()
+    versions = cache.snapshot(PROJECTS_SQL)
+    cache.bump("projects")  # write lands while the query is running
+    cache.put(PROJECTS_SQL, (), [{"stale": True}], versions)
+
+    assert cache.get(PROJECTS_SQL) is None
+
+
+def test_lru_eviction_and_ttl():
+    cache = QueryCache(max_entries=1)
+    _put(cache, "SELECT 1 FROM projects", [])
+    _put(cache, "SELECT 2 FROM projects", [])
+    assert cache.get("SELECT 1 FROM projects") is None
+
+    expired = QueryCache(ttl_seconds=0)
+    _put(expired, PROJECTS_SQL, [])
+    assert expired.get(PROJECTS_SQL) is None
+
+
+def test_only_plain_reads_are_cacheable():
+    assert is_cacheable(PROJECTS_SQL)
+    assert is_cacheable("WITH x AS (SELECT 1) SELECT * FROM x")
+    assert not is_cacheable("SELECT * FROM assets ORDER BY random() LIMIT 5")
+    assert not is_cacheable("UPDATE assets SET language = 'Dutch'")
+    assert not is_cacheable("SELECT pg_notify('query_cache', 'assets')")
+
+
+def test_database_execute_serves_repeated_reads_from_cache():
+    fake_cursor = MagicMock()
+    fake_cursor.fetchall.return_value = [{"count": 4}]
+    fake_conn = MagicMock()
+    fake_conn.cursor.return_value.__enter__.return_value = fake_cursor
+
+    cache = QueryCache()
+    db = Database()
+    db._settings = db._settings.model_copy(update={"db_cache_enabled": True})
+
+    async def run_twice():
+        await db.execute("SELECT COUNT(*) AS count FROM projects")
+        return await db.execute("SELECT COUNT(*) AS count FROM projects")
+
+    with patch("aldi_hoc_companion.db.db.psycopg2.connect", return_value=fake_conn) as mock_connect, \
+            patch("aldi_hoc_companion.db.db.get_query_cache", return_value=cache):
+        assert asyncio.run(run_twice()) == [{"count": 4}]
+
+    mock_connect.assert_called_once()
+    stats = db.get_db_stats()
+    assert (stats.cache_hits, stats.cache_misses, stats.query_count) == (1, 1, 1)
+
+
+def test_invalidation_listener_survives_any_error_and_closes_its_connections():
+    broken_conn = MagicMock()
+    cache = QueryCache()
+    _put(cache, PROJECTS_SQL, [{"project_name": "Kerst"}])
+    logger = MagicMock()
+
+    class Stop(BaseException):
+        pass
+
+    db = Database()
+    # 1st connection: select fails with a non-psycopg2 error; 2nd attempt: stop the loop
+    with patch("aldi_hoc_companion.db.db.psycopg2.connect", return_value=broken_conn), \
+            patch("aldi_hoc_companion.db.db.select.select", side_effect=ValueError("fd out of range")), \
+            patch("aldi_hoc_companion.db.db.get_query_cache", return_value=cache), \
+            patch("aldi_hoc_companion.core.logging.get_logger", return_value=logger), \
+            patch("aldi_hoc_companion.db.db.time.sleep", side_effect=[None, Stop()]):
+        with pytest.raises(Stop):
+            db._listen_sync("cache_invalidation")
+
+    assert broken_conn.close.call_count == 2
+    assert "ValueError: fd out of range" in logger.warning.call_args.args[0]
+    assert cache.get(PROJECTS_SQL, ()) is None
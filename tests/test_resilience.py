@@ -0,0 +1,143 @@
+import asyncio
+from unittest.mock import MagicMock, patch
+
+import pytest
+from pydantic_ai.exceptions import ModelHTTPError
+from pydantic_ai.messages import ModelRequest, ModelResponse, TextPart, UserPromptPart
+from pydantic_ai.models import Model, ModelRequestParameters
+from pydantic_ai.usage import RequestUsage
+
+from aldi_hoc_companion.agent import resilience
+from aldi_hoc_companion.agent.resilience import ModelUnavailableError, ResilientModel, track_calls
+
+
+@pytest.fixture(autouse=True)
+def quiet_logger():
+    with patch.object(resilience, "get_logger", MagicMock()):
+        yield
+
+
+class FakeModel(Model):
+    """Answers after `delay` seconds, raising the queued errors first."""
+
+    def __init__(self, name: str, delay: float = 0.0, errors: list[Exception] | None = None):
+        super().__init__()
+        self._name = name
+        self.delay = delay
+        self.errors = list(errors or [])
+        self.calls = 0
+        self.cancelled = False
+
+    @property
+    def model_name(self) -> str:
+        return self._name
+
+    @property
+    def system(self) -> str:
+        return "openai"
+
+    async def request(self, messages, model_settings, model_request_parameters) -> ModelResponse:
+        self.calls += 1
+        if self.errors:
+            raise self.errors.pop(0)
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return ModelResponse(
+            parts=[TextPart(content=f"answer from {self._name}")],
+            usage=RequestUsage(input_tokens=1_000_000, output_tokens=10),
+            model_name=self._name,
+        )
+
+
+def _request(model: ResilientModel):
+    async def run():
+        with track_calls() as calls:
+            response = await model.request(
+                [ModelRequest(parts=[UserPromptPart(content="q")])], None, ModelRequestParameters()
+            )
+        return response, calls
+
+    return asyncio.run(run())
+
+
+def test_transient_errors_are_retried():
+    primary = FakeModel("gpt-4o-mini", errors=[ModelHTTPError(503, "gpt-4o-mini"), ModelHTTPError(429, "gpt-4o-mini")])
+    response, calls = _request(ResilientModel(primary, retry_base_delay=0.0))
+
+    assert response.parts[0].content == "answer from gpt-4o-mini"
+    assert primary.calls == 3 and calls.retries == 2
+
+
+def test_non_transient_errors_are_not_retried():
+    primary = FakeModel("gpt-4o-mini", errors=[ModelHTTPError(400, "gpt-4o-mini")])
+    with pytest.raises(ModelHTTPError):
+        _request(ResilientModel(primary, fallback=FakeModel("gpt-4.1-mini"), retry_base_delay=0.0))
+    assert primary.calls == 1
+
+
+def test_slow_primary_is_hedged_and_loser_cancelled():
+    primary = FakeModel("gpt-4o-mini", delay=5.0)
+    fallback = FakeModel("gpt-4.1-mini", delay=0.01)
+    response, calls = _request(ResilientModel(primary, fallback=fallback, hedge_initial_delay=0.05))
+
+    assert response.parts[0].content == "answer from gpt-4.1-mini"
+    assert (calls.hedges, calls.hedge_wins, calls.failovers) == (1, 1, 0)
+    assert primary.cancelled
+    assert calls.tokens_by_model == {"gpt-4.1-mini": [1_000_000, 10]}
+    # The abandoned primary was sent the same 1M-token prompt
+    assert calls.extra_cost_usd == pytest.approx(0.15)
+
+
+def test_hedge_deadline_follows_primary_latency_percentile():
+    model = ResilientModel(FakeModel("gpt-4o-mini"), hedge_min_samples=3, hedge_initial_delay=10.0)
+    assert model.hedge_delay() == 10.0
+    model._latencies.extend([0.1, 0.2, 0.3, 5.0])
+    assert model.hedge_delay() == 5.0
+    model._latencies.extend([0.1] * 16)
+    assert model.hedge_delay() == 0.3
+
+
+def test_repeated_hedging_keeps_the_deadline_up():
+    # Every primary call is cancelled by the hedge; its elapsed time still counts
+    primary = FakeModel("gpt-4o-mini", delay=5.0)
+    model = ResilientModel(
+        primary, fallback=FakeModel("gpt-4.1-mini", delay=0.01), hedge_min_samples=3, hedge_initial_delay=0.05
+    )
+    model._latencies.extend([0.01] * 3)
+    assert model.hedge_delay() == 0.01
+
+    for _ in range(4):
+        _request(model)
+
+    assert len(model._latencies) == 7
+    assert min(list(model._latencies)[3:]) >= 0.01
+    assert model.hedge_delay() > 0.01
+
+
+def test_timed_out_primary_counts_as_slow():
+    model = ResilientModel(FakeModel("gpt-4o-mini", delay=5.0), timeout=0.05, max_retries=0)
+    with pytest.raises(ModelUnavailableError):
+        _request(model)
+    assert list(model._latencies) == [pytest.approx(0.05, abs=0.04)]
+
+
+def test_fails_over_when_primary_gives_up():
+    primary = FakeModel("gpt-4o-mini", errors=[ModelHTTPError(500, "gpt-4o-mini")] * 2)
+    fallback = FakeModel("gpt-4.1-mini")
+    response, calls = _request(ResilientModel(primary, fallback=fallback, max_retries=1, retry_base_delay=0.0))
+
+    assert response.parts[0].content == "answer from gpt-4.1-mini"
+    assert (calls.retries, calls.hedges, calls.failovers) == (1, 0, 1)
+
+
+def test_timeouts_everywhere_raise_model_unavailable():
+    model = ResilientModel(
+        FakeModel("gpt-4o-mini", delay=5.0), fallback=FakeModel("gpt-4.1-mini", delay=5.0),
+        timeout=0.05, max_retries=0, hedge_initial_delay=10.0,
+    )
+    with pytest.raises(ModelUnavailableError) as excinfo:
+        _request(model)
+    assert excinfo.value.timed_out
@@ -0,0 +1,136 @@
+from pydantic_ai.messages import ModelRequest, ModelResponse, SystemPromptPart, TextPart, UserPromptPart
+
+from aldi_hoc_companion.agent.sessions import (
+    DIGEST_HEADER,
+    FOLLOW_UP_CONTEXT_NOTE,
+    InMemorySessionStore,
+    SQLiteSessionStore,
+    compact_history,
+)
+
+
+def _turn(question: str, answer: str) -> list:
+    return [
+        ModelRequest(parts=[UserPromptPart(content=question)]),
+        ModelResponse(parts=[TextPart(content=answer)]),
+    ]
+
+
+def _conversation(turns: int) -> list:
+    messages = [
+        ModelRequest(parts=[SystemPromptPart(content="DB CONTEXT"), UserPromptPart(content="q0")]),
+        ModelResponse(parts=[TextPart(content="a0 " * 100)]),
+    ]
+    for i in range(1, turns):
+        messages += _turn(f"q{i}", f"a{i} " * 100)
+    return messages
+
+
+def test_compact_history_keeps_short_conversations_untouched():
+    messages = _conversation(2)
+    assert compact_history(messages, token_budget=10_000) is messages
+
+
+def test_compact_history_drops_old_turns_but_keeps_system_prompt_first():
+    compacted = compact_history(_conversation(5), token_budget=200)
+
+    head = compacted[0]
+    assert head.parts[0].content == "DB CONTEXT"
+    assert head.parts[1].content.startswith(DIGEST_HEADER)
+    assert "q0" in head.parts[1].content
+
+    # The latest turn is always kept verbatim
+    assert compacted[-2].parts[-1].content == "q4"
+    assert len(compacted) < 10
+
+
+def test_compact_history_merges_previous_digest():
+    once = compact_history(_conversation(5), token_budget=200)
+    twice = compact_history(once + _turn("q5", "a5 " * 100) + _turn("q6", "a6 " * 100), token_budget=200)
+
+    digests = [p for p in twice[0].parts if isinstance(p, SystemPromptPart) and p.content.startswith(DIGEST_HEADER)]
+    assert len(digests) == 1
+    assert "q0" in digests[0].content and "q4" in digests[0].content
+
+
+def test_in_memory_store_evicts_least_recently_used():
+    store = InMemorySessionStore(max_sessions=2)
+    store.save("a", _turn("qa", "aa"))
+    store.save("b", _turn("qb", "ab"))
+    store.load("a")
+    store.save("c", _turn("qc", "ac"))
+
+    assert store.load("b") == []
+    assert len(store.load("a")) == 2
+    assert len(store.load("c")) == 2
+
+
+def _refreshed(name: str, size: int = 0) -> list:
+    return [ModelRequest(parts=[SystemPromptPart(content=f"{FOLLOW_UP_CONTEXT_NOTE}{name}" + " x" * size)])]
+
+
+def _system_contents(messages: list) -> list[str]:
+    return [p.content for m in messages for p in m.parts if isinstance(p, SystemPromptPart)]
+
+
+def _session_with_context(context_chars: int) -> list:
+    return [ModelRequest(parts=[SystemPromptPart(content="x" * context_chars), UserPromptPart(content="q")])]
+
+
+def test_in_memory_store_is_bounded_by_size():
+    store = InMemorySessionStore(max_sessions=1000, max_bytes=2500)
+    for session_id in ("a", "b", "c"):
+        store.save(session_id, _session_with_context(1000))
+
+    # The catalogue-sized contexts count: only two sessions fit
+    assert store.load("a") == []
+    assert store.load("b") and store.load("c")
+    # Re-saving a session replaces its size instead of adding to it
+    store.save("c", _session_with_context(1000))
+    assert store.load("b")
+
+    # A session larger than the whole budget is still kept on its own
+    store.save("d", _session_with_context(5000))
+    assert [bool(store.load(s)) for s in "bcd"] == [False, False, True]
+
+
+def test_sqlite_store_is_bounded_by_size(tmp_path):
+    store = SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"), max_sessions=1000, max_bytes=2 * 1500)
+    for session_id in ("a", "b", "c"):
+        store.save(session_id, _session_with_context(1000))
+
+    assert store.load("a") == []
+    assert len(store.load("b")) == 1 and len(store.load("c")) == 1
+
+
+def test_compact_history_keeps_a_context_refreshed_for_a_kept_turn():
+    refreshed = _refreshed("NEW CONTEXT") + _turn("q5", "a5 " * 10)
+    compacted = compact_history(_conversation(5) + refreshed, token_budget=50)
+
+    head = compacted[0]
+    assert head.parts[0].content == "DB CONTEXT"
+    assert head.parts[1].content.startswith(DIGEST_HEADER)
+    assert head.parts[2].content == f"{FOLLOW_UP_CONTEXT_NOTE}NEW CONTEXT"
+    assert compacted[1].parts[0].content == "q5"
+
+
+def test_compact_history_keeps_only_the_latest_refreshed_context():
+    messages = _conversation(2) + _refreshed("C1") + _turn("q2", "a2") + _refreshed("C2") + _turn("q3", "a3")
+    compacted = compact_history(messages, token_budget=10_000)
+    assert _system_contents(compacted) == ["DB CONTEXT", f"{FOLLOW_UP_CONTEXT_NOTE}C2"]
+
+    # Five more turns later the head holds the original and the latest context, nothing stale
+    for i in range(4, 9):
+        compacted = compact_history(compacted + _turn(f"q{i}", f"a{i} " * 100), token_budget=200)
+    contents = _system_contents(compacted)
+    assert contents[0] == "DB CONTEXT" and contents[1].startswith(DIGEST_HEADER)
+    assert contents[2:] == [f"{FOLLOW_UP_CONTEXT_NOTE}C2"]
+
+
+def test_refreshed_contexts_count_towards_the_budget():
+    messages = _conversation(3) + _refreshed("BIG", size=400) + _turn("q3", "a3")
+    # Without the refreshed context the turns fit easily; with it, older turns go
+    compacted = compact_history(messages, token_budget=300)
+    assert compacted is not messages
+    assert compacted[0].parts[1].content.startswith(DIGEST_HEADER)
+    assert _system_contents(compacted)[-1].startswith(f"{FOLLOW_UP_CONTEXT_NOTE}BIG")
@@ -0,0 +1,51 @@
+import asyncio
+from unittest.mock import patch
+
+from pydantic_ai.messages import ModelResponse, TextPart
+from pydantic_ai.models.function import AgentInfo, FunctionModel
+
+from aldi_hoc_companion.agent import summaries
+from aldi_hoc_companion.agent.summaries import _summarize_assets, chunk_agent, summary_agent
+
+
+def _assets(n: int) -> list[dict]:
+    return [
+        {"asset_kind": "banner", "language": "Dutch", "campaign_context": "execution",
+         "asset_content": f"banner {i} " + "x" * 80, "document_content": None}
+        for i in range(n)
+    ]
+
+
+def _model(name: str, prompts: list[str]) -> FunctionModel:
+    def respond(messages, info: AgentInfo) -> ModelResponse:
+        prompts.append(messages[-1].parts[-1].content)
+        return ModelResponse(parts=[TextPart(content=f"{name} notes")])
+    return FunctionModel(respond)
+
+
+def _summarize(n_assets: int) -> tuple[str, list[str], list[str]]:
+    chunk_prompts, summary_prompts = [], []
+    project = {"project_name": "Kerstcampagne 2024", "year": 2024}
+    with patch.object(summaries, "CHUNK_TOKENS", 100), \
+            chunk_agent.override(model=_model("chunk", chunk_prompts)), \
+            summary_agent.override(model=_model("summary", summary_prompts)):
+        result = asyncio.run(_summarize_assets(project, _assets(n_assets), asyncio.Semaphore(2)))
+    return result, chunk_prompts, summary_prompts
+
+
+def test_small_project_is_summarized_in_one_call():
+    result, chunk_prompts, summary_prompts = _summarize(2)
+    assert result == "summary notes"
+    assert chunk_prompts == [] and len(summary_prompts) == 1
+    assert "banner 1" in summary_prompts[0]
+
+
+def test_large_project_is_summarized_map_reduce():
+    result, chunk_prompts, summary_prompts = _summarize(20)
+
+    # 20 assets of ~100 chars in chunks of <= 400 chars
+    assert len(chunk_prompts) >= 5
+    assert all(len(p) < 600 for p in chunk_prompts)
+    assert "banner 19" in chunk_prompts[-1]
+    assert result == "summary notes"
+    assert summary_prompts[0].count("chunk notes") == len(chunk_prompts)